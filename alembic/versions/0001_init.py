@@ -1,6 +1,11 @@
 from alembic import op
 import sqlalchemy as sa
 
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
 def upgrade():
     op.create_table(
         'users',
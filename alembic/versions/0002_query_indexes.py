@@ -0,0 +1,28 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# Indexes matching the lookups in main.py (see perf/plan_check.py).
+
+INDEXES = [
+    ('idx_users_email_lower', 'users', [sa.text('lower(email)')], {}),
+    ('idx_identity_checks_user_id', 'identity_checks', ['user_id'], {}),
+    ('idx_official_apps_sha256_hash', 'official_apps', ['sha256_hash'], {}),
+    ('idx_suspicious_apps_package_name', 'suspicious_apps', ['package_name'], {}),
+    ('idx_grievances_user_complaint', 'grievances', ['user_id', 'complaint_id'], {}),
+    ('idx_grievances_resolved_created_at', 'grievances', ['created_at'], {'postgresql_where': sa.text("status = 'RESOLVED'")}),
+]
+
+
+def upgrade():
+    for name, table, columns, kw in INDEXES:
+        op.create_index(name, table, columns, **kw)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Column defaults and NOT NULLs that database.init_db has always created but 0001 left out.
+
+
+def upgrade():
+    now = sa.text('NOW()')
+    op.alter_column('users', 'created_at', server_default=now)
+    op.alter_column('identity_checks', 'created_at', server_default=now)
+    op.alter_column('official_apps', 'last_verified', server_default=now)
+    op.alter_column('grievances', 'created_at', server_default=now)
+    op.alter_column('grievances', 'updated_at', server_default=now)
+    op.alter_column('grievances', 'category', server_default='other', nullable=False)
+    op.alter_column('grievances', 'urgency', server_default='MEDIUM', nullable=False)
+    op.alter_column('grievances', 'status', server_default='RECEIVED', nullable=False)
+    op.alter_column('grievances', 'complaint_id', nullable=False)
+    op.alter_column('grievances', 'text', nullable=False)
+
+
+def downgrade():
+    op.alter_column('grievances', 'text', nullable=True)
+    op.alter_column('grievances', 'complaint_id', nullable=True)
+    op.alter_column('grievances', 'status', server_default=None, nullable=True)
+    op.alter_column('grievances', 'urgency', server_default=None, nullable=True)
+    op.alter_column('grievances', 'category', server_default=None, nullable=True)
+    op.alter_column('grievances', 'updated_at', server_default=None)
+    op.alter_column('grievances', 'created_at', server_default=None)
+    op.alter_column('official_apps', 'last_verified', server_default=None)
+    op.alter_column('identity_checks', 'created_at', server_default=None)
+    op.alter_column('users', 'created_at', server_default=None)
@@ -0,0 +1,46 @@
+from alembic import op
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# NOTIFY app_registry on registry row changes, for the in-process index in app_registry.py.
+
+NOTIFY_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_app_registry() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('trustguard.bulk_import', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('app_registry', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP)::text);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('app_registry', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id)::text);
+    ELSE
+        PERFORM pg_notify('app_registry', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', NEW.id)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade():
+    op.execute(NOTIFY_FUNCTION)
+    for table in ('official_apps', 'suspicious_apps'):
+        op.execute(
+            f"CREATE TRIGGER {table}_notify AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION notify_app_registry()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_notify_truncate AFTER TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION notify_app_registry()"
+        )
+
+
+def downgrade():
+    for table in ('official_apps', 'suspicious_apps'):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_truncate ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_notify ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_app_registry()")
@@ -0,0 +1,18 @@
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# (publisher, id) indexes for the keyset-paginated registry listings filtered by publisher.
+
+
+def upgrade():
+    op.create_index('idx_official_apps_publisher_id', 'official_apps', ['publisher', 'id'])
+    op.create_index('idx_suspicious_apps_publisher_id', 'suspicious_apps', ['publisher', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_suspicious_apps_publisher_id', table_name='suspicious_apps')
+    op.drop_index('idx_official_apps_publisher_id', table_name='official_apps')
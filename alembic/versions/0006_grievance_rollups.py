@@ -0,0 +1,82 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Per-category grievance counters kept current by a trigger, read by /api/grievance/analytics.
+
+ROLLUP_FUNCTIONS = """
+CREATE OR REPLACE FUNCTION grievance_rollup_add(
+    cat TEXT, d_total BIGINT, d_high BIGINT, d_hours NUMERIC, d_count BIGINT
+) RETURNS void AS $$
+    INSERT INTO grievance_rollups AS r(category, total, high_pending, resolution_hours_sum, resolution_count)
+    VALUES (cat, d_total, d_high, d_hours, d_count)
+    ON CONFLICT (category) DO UPDATE SET
+        total = r.total + EXCLUDED.total,
+        high_pending = r.high_pending + EXCLUDED.high_pending,
+        resolution_hours_sum = r.resolution_hours_sum + EXCLUDED.resolution_hours_sum,
+        resolution_count = r.resolution_count + EXCLUDED.resolution_count;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION grievance_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM grievance_rollup_add(
+            OLD.category, -1,
+            CASE WHEN OLD.urgency = 'HIGH' AND OLD.status <> 'RESOLVED' THEN -1 ELSE 0 END,
+            -COALESCE(EXTRACT(EPOCH FROM (OLD.updated_at - OLD.created_at)) / 3600.0, 0),
+            CASE WHEN OLD.updated_at IS NOT NULL AND OLD.created_at IS NOT NULL THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM grievance_rollup_add(
+            NEW.category, 1,
+            CASE WHEN NEW.urgency = 'HIGH' AND NEW.status <> 'RESOLVED' THEN 1 ELSE 0 END,
+            COALESCE(EXTRACT(EPOCH FROM (NEW.updated_at - NEW.created_at)) / 3600.0, 0),
+            CASE WHEN NEW.updated_at IS NOT NULL AND NEW.created_at IS NOT NULL THEN 1 ELSE 0 END
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+ROLLUP_BACKFILL = """
+INSERT INTO grievance_rollups(category, total, high_pending, resolution_hours_sum, resolution_count)
+SELECT
+    category,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE urgency = 'HIGH' AND status <> 'RESOLVED'),
+    COALESCE(SUM(EXTRACT(EPOCH FROM (updated_at - created_at)) / 3600.0), 0),
+    COUNT(*) FILTER (WHERE updated_at IS NOT NULL AND created_at IS NOT NULL)
+FROM grievances
+GROUP BY category
+"""
+
+
+def upgrade():
+    op.create_table(
+        'grievance_rollups',
+        sa.Column('category', sa.String(64), primary_key=True),
+        sa.Column('total', sa.BigInteger, nullable=False, server_default='0'),
+        sa.Column('high_pending', sa.BigInteger, nullable=False, server_default='0'),
+        sa.Column('resolution_hours_sum', sa.Numeric, nullable=False, server_default='0'),
+        sa.Column('resolution_count', sa.BigInteger, nullable=False, server_default='0'),
+    )
+    op.execute("LOCK TABLE grievances IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(ROLLUP_FUNCTIONS)
+    op.execute(ROLLUP_BACKFILL)
+    op.execute(
+        "CREATE TRIGGER grievances_rollup AFTER INSERT OR UPDATE OR DELETE ON grievances "
+        "FOR EACH ROW EXECUTE FUNCTION grievance_rollup_trigger()"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS grievances_rollup ON grievances")
+    op.execute("DROP FUNCTION IF EXISTS grievance_rollup_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS grievance_rollup_add(TEXT, BIGINT, BIGINT, NUMERIC, BIGINT)")
+    op.drop_table('grievance_rollups')
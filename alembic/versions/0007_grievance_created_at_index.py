@@ -0,0 +1,16 @@
+from alembic import op
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# created_at range scans for the time-bucketed analytics in analytics.py.
+
+
+def upgrade():
+    op.create_index('idx_grievances_created_at', 'grievances', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('idx_grievances_created_at', table_name='grievances')
@@ -0,0 +1,24 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# Shared categorization results across API workers (categorizer.py, CATEGORIZE_CACHE_SHARED).
+
+
+def upgrade():
+    op.create_table(
+        'categorization_cache',
+        sa.Column('text_hash', sa.CHAR(64), primary_key=True),
+        sa.Column('model_version', sa.String(64), primary_key=True),
+        sa.Column('category', sa.String(64), nullable=False),
+        sa.Column('confidence', sa.Float, nullable=False, server_default='0.5'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()')),
+    )
+
+
+def downgrade():
+    op.drop_table('categorization_cache')
@@ -0,0 +1,21 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+# Pending-queue index, lease and attempt count for grievance_worker claims (see grievance_worker.process_batch).
+
+
+def upgrade():
+    op.create_index('idx_grievances_pending', 'grievances', ['id'], postgresql_where=sa.text("category = 'pending'"))
+    op.add_column('grievances', sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('grievances', sa.Column('categorize_attempts', sa.Integer, nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('grievances', 'categorize_attempts')
+    op.drop_column('grievances', 'claimed_until')
+    op.drop_index('idx_grievances_pending', table_name='grievances')
@@ -0,0 +1,19 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+# ids.py issues 63-bit identity_checks ids; the column default goes since the application assigns them.
+
+
+def upgrade():
+    op.alter_column('identity_checks', 'id', type_=sa.BigInteger, server_default=None)
+
+
+def downgrade():
+    # identity_checks.id stays BIGINT: rows with 63-bit ids from ids.py do not fit in INTEGER, and the
+    # application keeps writing such ids even on an older schema
+    pass
@@ -0,0 +1,90 @@
+from alembic import op
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+# grievance_rollups no longer tracks rows still queued for categorization ('pending'), and the trigger
+# ignores updates that leave the rolled-up columns unchanged (e.g. grievance_worker claims).
+
+ROLLUP_TRIGGER = """
+CREATE OR REPLACE FUNCTION grievance_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.category IS NOT DISTINCT FROM NEW.category
+       AND OLD.urgency IS NOT DISTINCT FROM NEW.urgency
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.created_at IS NOT DISTINCT FROM NEW.created_at
+       AND OLD.updated_at IS NOT DISTINCT FROM NEW.updated_at THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.category <> 'pending' THEN
+        PERFORM grievance_rollup_add(
+            OLD.category, -1,
+            CASE WHEN OLD.urgency = 'HIGH' AND OLD.status <> 'RESOLVED' THEN -1 ELSE 0 END,
+            -COALESCE(EXTRACT(EPOCH FROM (OLD.updated_at - OLD.created_at)) / 3600.0, 0),
+            CASE WHEN OLD.updated_at IS NOT NULL AND OLD.created_at IS NOT NULL THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.category <> 'pending' THEN
+        PERFORM grievance_rollup_add(
+            NEW.category, 1,
+            CASE WHEN NEW.urgency = 'HIGH' AND NEW.status <> 'RESOLVED' THEN 1 ELSE 0 END,
+            COALESCE(EXTRACT(EPOCH FROM (NEW.updated_at - NEW.created_at)) / 3600.0, 0),
+            CASE WHEN NEW.updated_at IS NOT NULL AND NEW.created_at IS NOT NULL THEN 1 ELSE 0 END
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_TRIGGER = """
+CREATE OR REPLACE FUNCTION grievance_rollup_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM grievance_rollup_add(
+            OLD.category, -1,
+            CASE WHEN OLD.urgency = 'HIGH' AND OLD.status <> 'RESOLVED' THEN -1 ELSE 0 END,
+            -COALESCE(EXTRACT(EPOCH FROM (OLD.updated_at - OLD.created_at)) / 3600.0, 0),
+            CASE WHEN OLD.updated_at IS NOT NULL AND OLD.created_at IS NOT NULL THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM grievance_rollup_add(
+            NEW.category, 1,
+            CASE WHEN NEW.urgency = 'HIGH' AND NEW.status <> 'RESOLVED' THEN 1 ELSE 0 END,
+            COALESCE(EXTRACT(EPOCH FROM (NEW.updated_at - NEW.created_at)) / 3600.0, 0),
+            CASE WHEN NEW.updated_at IS NOT NULL AND NEW.created_at IS NOT NULL THEN 1 ELSE 0 END
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+PENDING_ROLLUP = """
+INSERT INTO grievance_rollups(category, total, high_pending, resolution_hours_sum, resolution_count)
+SELECT
+    'pending',
+    COUNT(*),
+    COUNT(*) FILTER (WHERE urgency = 'HIGH' AND status <> 'RESOLVED'),
+    COALESCE(SUM(EXTRACT(EPOCH FROM (updated_at - created_at)) / 3600.0), 0),
+    COUNT(*) FILTER (WHERE updated_at IS NOT NULL AND created_at IS NOT NULL)
+FROM grievances
+WHERE category = 'pending'
+HAVING COUNT(*) > 0
+"""
+
+
+def upgrade():
+    op.execute("LOCK TABLE grievances IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(ROLLUP_TRIGGER)
+    op.execute("DELETE FROM grievance_rollups WHERE category = 'pending'")
+
+
+def downgrade():
+    op.execute("LOCK TABLE grievances IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(PREVIOUS_TRIGGER)
+    op.execute(PENDING_ROLLUP)
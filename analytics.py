@@ -0,0 +1,157 @@
+"""
+Time-bucketed grievance analytics.
+- Bucketing (date_trunc) and percentiles (percentile_cont) run in Postgres over an indexed created_at range
+- Closed buckets (ending before now) are cached, so repeated dashboard queries only re-read the open bucket;
+  a bucket still holding uncategorized ('pending') grievances is not cached until the workers catch up
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+from database import fetchall, fetchone
+from grievance_worker import PENDING
+
+BUCKETS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_WINDOWS = {"hour": timedelta(hours=24), "day": timedelta(days=30)}
+PERCENTILES = (0.5, 0.9, 0.99)
+ANALYTICS_MAX_BUCKETS = int(os.getenv("ANALYTICS_MAX_BUCKETS", "2000"))
+# Late status changes can still move a closed bucket's percentiles, so closed entries expire eventually
+ANALYTICS_CLOSED_BUCKET_TTL = float(os.getenv("ANALYTICS_CLOSED_BUCKET_TTL", "3600"))
+ANALYTICS_BUCKET_CACHE_SIZE = int(os.getenv("ANALYTICS_BUCKET_CACHE_SIZE", "20000"))
+
+closed_buckets = TTLCache("analytics_closed_buckets", maxsize=ANALYTICS_BUCKET_CACHE_SIZE, ttl=ANALYTICS_CLOSED_BUCKET_TTL)
+
+_RESOLUTION_HOURS = "(EXTRACT(EPOCH FROM (updated_at - created_at)) / 3600.0)::double precision"
+_PERCENTILE_EXPR = f"percentile_cont(ARRAY[{', '.join(str(p) for p in PERCENTILES)}]) WITHIN GROUP (ORDER BY {_RESOLUTION_HOURS})"
+_BUCKET_COUNTS = """
+SELECT date_trunc(%s, created_at AT TIME ZONE 'UTC') AS bucket, category, urgency, COUNT(*) AS c
+FROM grievances
+WHERE created_at >= %s AND created_at < %s
+GROUP BY 1, 2, 3
+"""
+_BUCKET_RESOLVED = f"""
+SELECT date_trunc(%s, created_at AT TIME ZONE 'UTC') AS bucket, COUNT(*) AS c, {_PERCENTILE_EXPR} AS p
+FROM grievances
+WHERE created_at >= %s AND created_at < %s AND status = 'RESOLVED'
+GROUP BY 1
+"""
+_WINDOW_PERCENTILES = f"""
+SELECT COUNT(*) AS c, {_PERCENTILE_EXPR} AS p
+FROM grievances
+WHERE created_at >= %s AND created_at < %s AND status = 'RESOLVED'
+"""
+
+
+class AnalyticsError(ValueError):
+    pass
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def _floor(dt: datetime, bucket: str) -> datetime:
+    dt = dt.replace(minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        dt = dt.replace(hour=0)
+    return dt
+
+
+def _ceil(dt: datetime, bucket: str) -> datetime:
+    floored = _floor(dt, bucket)
+    return floored if floored == dt else floored + BUCKETS[bucket]
+
+
+def _percentiles(values: Optional[List[float]]) -> Dict[str, Optional[float]]:
+    values = values or [None] * len(PERCENTILES)
+    return {f"p{int(p * 100)}": (round(v, 2) if v is not None else None) for p, v in zip(PERCENTILES, values)}
+
+
+def _empty_bucket(start: datetime) -> Dict[str, Any]:
+    return {
+        "bucket": start.isoformat(),
+        "total": 0,
+        "by_category": {},
+        "by_urgency": {},
+        "resolved": 0,
+        "resolution_hours": _percentiles(None),
+    }
+
+
+def _query_buckets(bucket: str, start: datetime, end: datetime) -> Dict[datetime, Dict[str, Any]]:
+    out: Dict[datetime, Dict[str, Any]] = {}
+    counts = fetchall(_BUCKET_COUNTS, [bucket, start, end])
+    for r in counts:
+        b = r["bucket"].replace(tzinfo=timezone.utc)
+        entry = out.setdefault(b, _empty_bucket(b))
+        entry["total"] += r["c"]
+        entry["by_category"][r["category"]] = entry["by_category"].get(r["category"], 0) + r["c"]
+        entry["by_urgency"][r["urgency"]] = entry["by_urgency"].get(r["urgency"], 0) + r["c"]
+    resolved = fetchall(_BUCKET_RESOLVED, [bucket, start, end])
+    for r in resolved:
+        b = r["bucket"].replace(tzinfo=timezone.utc)
+        entry = out.setdefault(b, _empty_bucket(b))
+        entry["resolved"] = r["c"]
+        entry["resolution_hours"] = _percentiles(r["p"])
+    return out
+
+
+def _window_percentiles(start: datetime, end: datetime, closed: bool) -> Dict[str, Any]:
+    key = ("window", start, end)
+    if closed:
+        cached = closed_buckets.get(key)
+        if cached is not None:
+            return cached
+    row = fetchone(_WINDOW_PERCENTILES, [start, end])
+    result = {"resolved": row["c"] if row else 0, **_percentiles(row["p"] if row else None)}
+    if closed:
+        closed_buckets.set(key, result)
+    return result
+
+
+def timeseries(bucket: str, start: Optional[datetime] = None, end: Optional[datetime] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+    if bucket not in BUCKETS:
+        raise AnalyticsError(f"bucket must be one of {', '.join(BUCKETS)}")
+    now = _utc(now or datetime.now(timezone.utc))
+    end = _ceil(_utc(end) if end else now, bucket)
+    start = _floor(_utc(start) if start else end - DEFAULT_WINDOWS[bucket], bucket)
+    if start >= end:
+        raise AnalyticsError("start must be before end")
+    width = BUCKETS[bucket]
+    if (end - start) / width > ANALYTICS_MAX_BUCKETS:
+        raise AnalyticsError(f"window spans more than {ANALYTICS_MAX_BUCKETS} {bucket} buckets")
+
+    starts: List[datetime] = []
+    b = start
+    while b < end:
+        starts.append(b)
+        b += width
+
+    series: Dict[datetime, Dict[str, Any]] = {}
+    missing: List[datetime] = []
+    for b in starts:
+        cached = closed_buckets.get((bucket, b)) if b + width <= now else None
+        if cached is not None:
+            series[b] = cached
+        else:
+            missing.append(b)
+
+    cache_hits = len(series)
+    if missing:
+        # One range query covering every bucket we could not serve from cache
+        fetched = _query_buckets(bucket, missing[0], missing[-1] + width)
+        for b in missing:
+            entry = fetched.get(b) or _empty_bucket(b)
+            series[b] = entry
+            if b + width <= now and PENDING not in entry["by_category"]:
+                closed_buckets.set((bucket, b), entry)
+
+    return {
+        "bucket": bucket,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "series": [series[b] for b in starts],
+        "resolution_hours": _window_percentiles(start, end, closed=end <= now),
+        "cached_buckets": cache_hits,
+    }
@@ -0,0 +1,309 @@
+"""
+Process-local index of the app registry (official_apps + suspicious_apps).
+- Loaded once at startup, keyed by package_name and sha256_hash
+- Kept current by a LISTEN/NOTIFY listener thread (see the app_registry triggers in database.init_db);
+  only that thread applies changes, so writers rely on their NOTIFY rather than refreshing the index themselves
+- Turns app verification into dict lookups with zero DB round-trips
+- Table fingerprints (used for listing ETags) are only offered while the listener is connected and caught up
+"""
+import hashlib
+import json
+import logging
+import os
+import select
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+from database import _DB_URL, fetchall, statement
+
+logger = logging.getLogger("trustguard")
+
+CHANNEL = "app_registry"
+OFFICIAL_COLUMNS = "id, package_name, sha256_hash, publisher, google_play_link, last_verified"
+SUSPICIOUS_COLUMNS = "id, package_name, publisher, google_play_link, confidence"
+_OFFICIAL_BY_IDS = statement("official_apps_by_ids", f"SELECT {OFFICIAL_COLUMNS} FROM official_apps WHERE id = ANY(%s)")
+_SUSPICIOUS_BY_IDS = statement("suspicious_apps_by_ids", f"SELECT {SUSPICIOUS_COLUMNS} FROM suspicious_apps WHERE id = ANY(%s)")
+# More pending notifications than this in one drain triggers a full reload instead of per-row fetches
+APP_REGISTRY_BULK_RELOAD = int(os.getenv("APP_REGISTRY_BULK_RELOAD", "500"))
+# Safety net: full reload even if no notification arrived
+APP_REGISTRY_RESYNC_SECONDS = float(os.getenv("APP_REGISTRY_RESYNC_SECONDS", "300"))
+APP_REGISTRY_RECONNECT_SECONDS = float(os.getenv("APP_REGISTRY_RECONNECT_SECONDS", "5"))
+# The listener round-trips on its connection this often; fingerprints are only served while the last
+# confirmed sync (all notifications up to it applied) is at most APP_REGISTRY_MAX_LAG_SECONDS old
+APP_REGISTRY_HEARTBEAT_SECONDS = float(os.getenv("APP_REGISTRY_HEARTBEAT_SECONDS", "2"))
+APP_REGISTRY_MAX_LAG_SECONDS = float(os.getenv("APP_REGISTRY_MAX_LAG_SECONDS", "5"))
+
+
+def verdict_from_rows(official: Optional[Dict[str, Any]], suspicious: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if official:
+        return {
+            "status": "OFFICIAL",
+            "publisher": official.get("publisher"),
+            "google_play_link": official.get("google_play_link"),
+            "confidence": 0.98,
+        }
+    if suspicious:
+        return {
+            "status": "SUSPICIOUS",
+            "publisher": suspicious.get("publisher"),
+            "google_play_link": suspicious.get("google_play_link"),
+            "confidence": suspicious.get("confidence", 0.8),
+        }
+    return {"status": "UNKNOWN", "publisher": None, "google_play_link": None, "confidence": 0.5}
+
+
+def _row_hash(row: Dict[str, Any]) -> int:
+    digest = hashlib.blake2b(repr(tuple(row.values())).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class _Table:
+    """
+    Rows of one registry table by id, with secondary indexes key -> ids.
+    `digest` is an order-independent XOR of row hashes: identical contents give the same
+    value in every process, and it is updated incrementally on put/remove.
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = list(keys)
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.index: Dict[str, Dict[str, Set[int]]] = {k: {} for k in self.keys}
+        self.digest = 0
+
+    def put(self, row: Dict[str, Any]) -> None:
+        self.remove(row["id"])
+        self.rows[row["id"]] = row
+        self.digest ^= _row_hash(row)
+        for k in self.keys:
+            if row.get(k) is not None:
+                self.index[k].setdefault(row[k], set()).add(row["id"])
+
+    def remove(self, row_id: int) -> None:
+        old = self.rows.pop(row_id, None)
+        if old is None:
+            return
+        self.digest ^= _row_hash(old)
+        for k in self.keys:
+            ids = self.index[k].get(old.get(k))
+            if ids is not None:
+                ids.discard(row_id)
+                if not ids:
+                    del self.index[k][old.get(k)]
+
+    def first(self, key: str, value: Optional[str]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            return None
+        ids = self.index[key].get(value)
+        return self.rows[min(ids)] if ids else None
+
+
+def _lookup(official_table: _Table, suspicious_table: _Table, package_name: Optional[str], sha256_hash: Optional[str]) -> Dict[str, Any]:
+    official = official_table.first("package_name", package_name) or official_table.first("sha256_hash", sha256_hash)
+    suspicious = None if official else suspicious_table.first("package_name", package_name)
+    return verdict_from_rows(official, suspicious)
+
+
+def resolve_from_rows(
+    items: Iterable[Tuple[Optional[str], Optional[str]]],
+    official_rows: Iterable[Dict[str, Any]],
+    suspicious_rows: Iterable[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Resolve (package_name, sha256_hash) pairs against rows fetched by a set-based query."""
+    official = _Table(["package_name", "sha256_hash"])
+    suspicious = _Table(["package_name"])
+    for r in official_rows:
+        official.put(r)
+    for r in suspicious_rows:
+        suspicious.put(r)
+    return [_lookup(official, suspicious, pkg, sha) for pkg, sha in items]
+
+
+class AppRegistryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._official = _Table(["package_name", "sha256_hash"])
+        self._suspicious = _Table(["package_name"])
+        self._listeners: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.ready = False
+        self.version = 0
+        self.synced_at: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.notifications = 0
+        self.reloads = 0
+
+    def on_change(self, callback: Callable[[], None]) -> None:
+        self._listeners.append(callback)
+
+    def _changed(self) -> None:
+        self.version += 1
+        for cb in self._listeners:
+            try:
+                cb()
+            except Exception:
+                logger.exception("app registry change callback failed")
+
+    # ----- loading -----
+    def load(self) -> None:
+        official = fetchall(f"SELECT {OFFICIAL_COLUMNS} FROM official_apps")
+        suspicious = fetchall(f"SELECT {SUSPICIOUS_COLUMNS} FROM suspicious_apps")
+        off_table = _Table(self._official.keys)
+        sus_table = _Table(self._suspicious.keys)
+        for r in official:
+            off_table.put(r)
+        for r in suspicious:
+            sus_table.put(r)
+        with self._lock:
+            self._official, self._suspicious = off_table, sus_table
+            self.ready = True
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self._changed()
+        logger.info("app registry loaded official=%s suspicious=%s", len(official), len(suspicious))
+
+    def refresh(self, table: str, ids: Iterable[int]) -> None:
+        """
+        Re-read the given rows of `table` and apply inserts, updates and deletes.
+        Called only from the listener thread, so fetch-then-apply never races another refresh or load.
+        """
+        ids = list(set(ids))
+        if not ids:
+            return
+        if table == "official_apps":
+            rows = fetchall(_OFFICIAL_BY_IDS, [ids])
+        elif table == "suspicious_apps":
+            rows = fetchall(_SUSPICIOUS_BY_IDS, [ids])
+        else:
+            return
+        found = {r["id"] for r in rows}
+        with self._lock:
+            target = self._official if table == "official_apps" else self._suspicious
+            for r in rows:
+                target.put(r)
+            for row_id in ids:
+                if row_id not in found:
+                    target.remove(row_id)
+            self._changed()
+
+    # ----- lookups -----
+    def lookup(self, package_name: Optional[str], sha256_hash: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            return _lookup(self._official, self._suspicious, package_name, sha256_hash)
+
+    def lookup_many(self, items: Iterable[Tuple[Optional[str], Optional[str]]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [_lookup(self._official, self._suspicious, pkg, sha) for pkg, sha in items]
+
+    def in_sync(self) -> bool:
+        """True while the listener is connected and has applied every notification up to a recent round-trip."""
+        synced_at = self.synced_at
+        return synced_at is not None and time.monotonic() - synced_at <= APP_REGISTRY_MAX_LAG_SECONDS
+
+    def fingerprint(self, table: str) -> Optional[str]:
+        """Content fingerprint of a table as currently indexed, or None unless the index is loaded and in sync."""
+        with self._lock:
+            if not self.ready or not self.in_sync():
+                return None
+            target = self._official if table == "official_apps" else self._suspicious
+            return "%016x-%d" % (target.digest, len(target.rows))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "version": self.version,
+                "official": len(self._official.rows),
+                "suspicious": len(self._suspicious.rows),
+                "loaded_at": self.loaded_at,
+                "notifications": self.notifications,
+                "reloads": self.reloads,
+                "listening": bool(self._thread and self._thread.is_alive()),
+                "in_sync": self.in_sync(),
+            }
+
+    # ----- LISTEN/NOTIFY -----
+    def start(self) -> None:
+        """Start the listener thread; it performs the initial load once it is subscribed."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="app-registry-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=APP_REGISTRY_RECONNECT_SECONDS)
+
+    def _listen_forever(self) -> None:
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(_DB_URL)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                # Subscribe first, then load, so no change between the two is missed
+                loaded_from = time.monotonic()
+                self.load()
+                self.synced_at = loaded_from
+                self._listen(conn)
+            except Exception as e:
+                self.synced_at = None
+                logger.warning("app registry listener error, reconnecting: %s", str(e))
+                self._stop.wait(APP_REGISTRY_RECONNECT_SECONDS)
+            finally:
+                self.synced_at = None
+                if conn is not None:
+                    conn.close()
+
+    def _listen(self, conn) -> None:
+        last_sync = last_heartbeat = time.monotonic()
+        while not self._stop.is_set():
+            ready, _, _ = select.select([conn], [], [], min(1.0, APP_REGISTRY_HEARTBEAT_SECONDS))
+            if ready:
+                conn.poll()
+            heard_at = None
+            if time.monotonic() - last_heartbeat >= APP_REGISTRY_HEARTBEAT_SECONDS:
+                # Notifications committed before this round-trip arrive ahead of its reply
+                heard_at = last_heartbeat = time.monotonic()
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            if conn.notifies:
+                pending = conn.notifies[:]
+                del conn.notifies[:]
+                self.notifications += len(pending)
+                self._apply(pending)
+            if heard_at is not None:
+                self.synced_at = heard_at
+            if time.monotonic() - last_sync >= APP_REGISTRY_RESYNC_SECONDS:
+                last_sync = time.monotonic()
+                self.load()
+                self.synced_at = last_sync
+
+    def _apply(self, notifies) -> None:
+        changed: Dict[str, Set[int]] = {}
+        full_reload = len(notifies) > APP_REGISTRY_BULK_RELOAD
+        for n in notifies:
+            try:
+                msg = json.loads(n.payload)
+            except ValueError:
+                full_reload = True
+                continue
+            if msg.get("op") == "TRUNCATE" or msg.get("id") is None:
+                full_reload = True
+            else:
+                changed.setdefault(msg.get("table"), set()).add(int(msg["id"]))
+        if full_reload:
+            self.load()
+            return
+        for table, ids in changed.items():
+            self.refresh(table, ids)
+
+
+registry = AppRegistryIndex()
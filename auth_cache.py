@@ -0,0 +1,61 @@
+"""
+Caches for the authentication read path.
+- Verified JWT claims keyed by a hash of the token, never outliving the token's `exp`
+- User profiles for /api/auth/me, with explicit invalidation when a profile changes
+"""
+import hashlib
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from cache import TTLCache
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# Upper bound on how long verified claims are reused; entries also expire at the token's exp
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000"))
+# Bounds staleness across API processes, which do not see each other's invalidations
+USER_PROFILE_CACHE_TTL = float(os.getenv("USER_PROFILE_CACHE_TTL", "60"))
+
+token_cache = TTLCache("auth_tokens", maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL)
+profile_cache = TTLCache("user_profiles", maxsize=USER_PROFILE_CACHE_SIZE, ttl=USER_PROFILE_CACHE_TTL)
+
+
+def _token_key(token: str) -> str:
+    # Raw tokens are credentials; keep only a digest in memory
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verified_claims(token: str, verify: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """Claims for `token`, calling `verify` (which raises on invalid tokens) only on a cache miss."""
+    key = _token_key(token)
+    claims = token_cache.get(key)
+    if claims is not None:
+        exp = claims.get("exp")
+        if exp is None or exp > time.time():
+            return claims
+        token_cache.delete(key)
+    claims = verify(token)
+    ttl = AUTH_TOKEN_CACHE_TTL
+    exp = claims.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        token_cache.set(key, claims, ttl=ttl)
+    return claims
+
+
+def user_profile(user_id: int, load: Callable[[int], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Profile for `user_id`, calling `load` on a miss; missing users are not cached."""
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = load(user_id)
+        if profile is not None:
+            profile_cache.set(user_id, profile)
+    return profile
+
+
+def invalidate_user(user_id: int) -> None:
+    """Called by every endpoint that writes a user's row, so /me reflects it immediately in this process."""
+    profile_cache.delete(user_id)
+
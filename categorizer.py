@@ -0,0 +1,315 @@
+"""
+Grievance categorization in front of grievance-ml.
+- Memoizes results keyed by a hash of the normalized complaint text (LRU + TTL)
+- Optionally shares results across workers through the categorization_cache table
+- Entries are tied to the model version reported by grievance-ml; a new version invalidates them.
+  The version is re-read from /health every CATEGORIZE_VERSION_REFRESH_SECONDS, so a redeployed model
+  is noticed even while every lookup is a cache hit
+- Cache misses from concurrent requests are micro-batched into one /categorize/batch round-trip
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+from database import execute, fetchone, statement
+from ml_client import MLServiceError, grievance_client
+
+logger = logging.getLogger("trustguard")
+
+CATEGORIZE_CACHE_SIZE = int(os.getenv("CATEGORIZE_CACHE_SIZE", "50000"))
+CATEGORIZE_CACHE_TTL = float(os.getenv("CATEGORIZE_CACHE_TTL", "86400"))
+CATEGORIZE_CACHE_SHARED = os.getenv("CATEGORIZE_CACHE_SHARED", "0").lower() in ("1", "true", "yes")
+CATEGORIZE_MICROBATCH = os.getenv("CATEGORIZE_MICROBATCH", "1").lower() in ("1", "true", "yes")
+CATEGORIZE_BATCH_MAX = int(os.getenv("CATEGORIZE_BATCH_MAX", "64"))
+CATEGORIZE_BATCH_WAIT_MS = float(os.getenv("CATEGORIZE_BATCH_WAIT_MS", "5"))
+CATEGORIZE_BATCH_CONCURRENCY = int(os.getenv("CATEGORIZE_BATCH_CONCURRENCY", "4"))
+CATEGORIZE_BATCH_RESULT_TIMEOUT = float(os.getenv("CATEGORIZE_BATCH_RESULT_TIMEOUT", "15"))
+# 0 disables the background check; the version is then only learned from categorize responses
+CATEGORIZE_VERSION_REFRESH_SECONDS = float(os.getenv("CATEGORIZE_VERSION_REFRESH_SECONDS", "60"))
+
+_SHARED_GET = statement(
+    "categorization_cache_get",
+    """
+    SELECT category, confidence FROM categorization_cache
+    WHERE text_hash=%s AND model_version=%s AND created_at > NOW() - make_interval(secs => %s)
+    """,
+)
+_SHARED_PUT = statement(
+    "categorization_cache_put",
+    """
+    INSERT INTO categorization_cache(text_hash, model_version, category, confidence)
+    VALUES(%s,%s,%s,%s)
+    ON CONFLICT (text_hash, model_version) DO UPDATE
+    SET category=EXCLUDED.category, confidence=EXCLUDED.confidence, created_at=NOW()
+    """,
+)
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_DIGITS_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Case, punctuation, whitespace and digit runs (amounts, dates, refs) do not change the category."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCT_RE.sub(" ", text)
+    text = _DIGITS_RE.sub("0", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+
+class Categorizer:
+    def __init__(self):
+        self.local = TTLCache("categorizations", maxsize=CATEGORIZE_CACHE_SIZE, ttl=CATEGORIZE_CACHE_TTL)
+        self.batcher: Optional[MicroBatcher] = None
+        if CATEGORIZE_MICROBATCH:
+            self.batcher = MicroBatcher(
+                "categorize",
+                self._remote_many,
+                max_items=CATEGORIZE_BATCH_MAX,
+                max_wait_ms=CATEGORIZE_BATCH_WAIT_MS,
+                concurrency=CATEGORIZE_BATCH_CONCURRENCY,
+            )
+        self.shared = CATEGORIZE_CACHE_SHARED
+        self.model_version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._version_thread: Optional[threading.Thread] = None
+        self.shared_hits = 0
+        self.misses = 0
+        self.ml_calls = 0
+        self.ml_items = 0
+        self.ml_ms_total = 0.0
+        self.saved_ms = 0.0
+
+    # ----- model version -----
+    def _observe_version(self, version: Optional[str]) -> None:
+        if not version or version == self.model_version:
+            return
+        with self._lock:
+            if version != self.model_version:
+                logger.info("grievance model version %s -> %s, invalidating categorization cache", self.model_version, version)
+                self.model_version = version
+                self.local.clear()
+
+    def refresh_version(self) -> None:
+        """Read the model version from grievance-ml's /health; failures leave the current version in place."""
+        try:
+            version = grievance_client.health().get("model_version")
+        except Exception as e:
+            logger.debug("grievance model version check failed: %s", str(e))
+            return
+        self._observe_version(version)
+
+    def _start_version_refresh(self) -> None:
+        if self._version_thread is not None or CATEGORIZE_VERSION_REFRESH_SECONDS <= 0:
+            return
+        with self._lock:
+            if self._version_thread is None:
+                self._version_thread = threading.Thread(target=self._refresh_version_forever, name="categorizer-version", daemon=True)
+                self._version_thread.start()
+
+    def _refresh_version_forever(self) -> None:
+        while True:
+            time.sleep(CATEGORIZE_VERSION_REFRESH_SECONDS)
+            self.refresh_version()
+
+    # ----- shared (Postgres) tier -----
+    def _shared_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.shared or self.model_version is None:
+            return None
+        try:
+            row = fetchone(_SHARED_GET, [key, self.model_version, CATEGORIZE_CACHE_TTL])
+        except Exception as e:
+            logger.warning("shared categorization cache read failed: %s", str(e))
+            return None
+        return {"category": row["category"], "confidence": row["confidence"]} if row else None
+
+    def _shared_put(self, key: str, version: str, result: Dict[str, Any]) -> None:
+        if not self.shared:
+            return
+        try:
+            execute(_SHARED_PUT, [key, version, result["category"], result["confidence"]])
+        except Exception as e:
+            logger.warning("shared categorization cache write failed: %s", str(e))
+
+    # ----- stats -----
+    def _avg_ml_ms(self) -> float:
+        return self.ml_ms_total / self.ml_calls if self.ml_calls else 0.0
+
+    def _hit(self) -> None:
+        with self._lock:
+            self.saved_ms += self._avg_ml_ms()
+
+    def stats(self) -> Dict[str, Any]:
+        local = self.local.stats()
+        with self._lock:
+            hits = local["hits"] + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                **local,
+                "model_version": self.model_version,
+                "shared": self.shared,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "ml_calls": self.ml_calls,
+                "ml_items": self.ml_items,
+                "microbatch": self.batcher.stats() if self.batcher else None,
+                "ml_ms_avg": round(self._avg_ml_ms(), 2),
+                "saved_ms": round(self.saved_ms, 1),
+            }
+
+    # ----- remote calls -----
+    def _remote_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        j = grievance_client.post_json("/categorize/batch", json={"texts": texts})
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        results = j.get("results") or []
+        if len(results) != len(texts):
+            raise MLServiceError(f"grievance ML batch returned {len(results)} results for {len(texts)} texts")
+        with self._lock:
+            self.ml_calls += 1
+            self.ml_items += len(texts)
+            self.ml_ms_total += elapsed_ms
+        self._observe_version(j.get("model_version"))
+        return [{"category": r.get("category", "other"), "confidence": r.get("confidence", 0.5)} for r in results]
+
+    def _remote_one(self, text: str) -> Dict[str, Any]:
+        if self.batcher is not None:
+            return self.batcher.submit(text).result(timeout=CATEGORIZE_BATCH_RESULT_TIMEOUT)
+        return self._remote_many([text])[0]
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self.local.get((key, self.model_version))
+        if cached is not None:
+            self._hit()
+            return cached
+        shared = self._shared_get(key)
+        if shared is not None:
+            with self._lock:
+                self.shared_hits += 1
+            self._hit()
+            self.local.set((key, self.model_version), shared)
+        return shared
+
+    def _store(self, key: str, result: Dict[str, Any]) -> None:
+        self.local.set((key, self.model_version), result)
+        if self.model_version is not None:
+            self._shared_put(key, self.model_version, result)
+
+    # ----- categorize -----
+    def categorize(self, text: str) -> Dict[str, Any]:
+        """Category and confidence for `text`; raises on ML failure so callers can apply their fallback."""
+        self._start_version_refresh()
+        key = text_hash(text)
+        result = self._lookup(key)
+        if result is not None:
+            return result
+        with self._lock:
+            self.misses += 1
+        result = self._remote_one(text)
+        self._store(key, result)
+        return result
+
+    def categorize_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Results in input order; cache misses go to grievance-ml in batches of CATEGORIZE_BATCH_MAX."""
+        self._start_version_refresh()
+        keys = [text_hash(t) for t in texts]
+        found: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in pending:
+                continue
+            result = self._lookup(key)
+            if result is not None:
+                found[key] = result
+            else:
+                pending[key] = text
+        with self._lock:
+            self.misses += len(pending)
+        items = list(pending.items())
+        for i in range(0, len(items), CATEGORIZE_BATCH_MAX):
+            chunk = items[i:i + CATEGORIZE_BATCH_MAX]
+            for (key, _), result in zip(chunk, self._remote_many([t for _, t in chunk])):
+                found[key] = result
+                self._store(key, result)
+        return [found[k] for k in keys]
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests for up to `max_wait_ms` (or `max_items`)
+    and sends them as one batch call, fanning results back to each caller's Future.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]], max_items: int, max_wait_ms: float, concurrency: int):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_items = max_items
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"{name}-batch")
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: Any) -> Future:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._collect, name=f"{self.name}-collector", daemon=True)
+                    self._thread.start()
+        fut: Future = Future()
+        self._queue.put((item, fut))
+        return fut
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[Tuple[Any, Future]]) -> None:
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+
+categorizer = Categorizer()
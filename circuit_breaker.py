@@ -0,0 +1,123 @@
+"""
+Circuit breaker for outbound service calls.
+- CLOSED: calls flow, outcomes are tracked over a rolling window
+- OPEN: calls are rejected immediately until the cool-down expires or a health probe succeeds
+- HALF_OPEN: a limited number of trial calls decide whether to close or re-open
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._outcomes: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._rejected = 0
+        self._transitions = 0
+        self._last_failure: Optional[str] = None
+        self._last_probe: Optional[Dict[str, Any]] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            self._transitions += 1
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._half_open_in_flight = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed; callers must then report its outcome."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def release(self) -> None:
+        """Give back an allowed call that never reached the service."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._set_state(CLOSED)
+                return
+            self._outcomes.append(True)
+
+    def record_failure(self, reason: Optional[str] = None) -> None:
+        with self._lock:
+            self._last_failure = reason
+            if self._state == HALF_OPEN:
+                self._set_state(OPEN)
+                return
+            self._outcomes.append(False)
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for ok in self._outcomes if not ok)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._set_state(OPEN)
+
+    def record_probe(self, healthy: bool, detail: Optional[str] = None) -> None:
+        """Result of a background health probe; a healthy probe lets trial traffic through."""
+        with self._lock:
+            self._last_probe = {"healthy": healthy, "detail": detail, "at": time.time()}
+            if healthy and self._state == OPEN:
+                self._set_state(HALF_OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            calls = len(self._outcomes)
+            failures = sum(1 for ok in self._outcomes if not ok)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "window_calls": calls,
+                "window_failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "failure_rate_threshold": self.failure_rate,
+                "open_for_s": round(time.monotonic() - self._opened_at, 3) if self._state == OPEN else 0.0,
+                "rejected": self._rejected,
+                "transitions": self._transitions,
+                "last_failure": self._last_failure,
+                "last_probe": self._last_probe,
+            }
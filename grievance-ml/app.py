@@ -1,21 +1,45 @@
+import os
 from flask import Flask, request, jsonify
+
+from classifier import ClassifierEngine
+
 app = Flask(__name__)
 
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model.npz"))
+MAX_BATCH = int(os.getenv("MAX_BATCH", "1024"))
+
+def _load_engine():
+    if os.path.exists(MODEL_PATH):
+        return ClassifierEngine.load(MODEL_PATH)
+    # No exported model (e.g. local dev): train on the seed corpus once at startup
+    from train import train_seed
+    engine, _ = train_seed()
+    return engine
+
+# Loaded once; every request (single or batch) is scored with one matrix multiply
+engine = _load_engine()
+# Reported with every result so API-side caches can drop entries from older models
+MODEL_VERSION = engine.version
+
 @app.get('/health')
 def health():
-    return jsonify(success=True, statusCode=200, data={"service":"grievance-ml","status":"ok"})
+    return jsonify(success=True, statusCode=200, data={"service":"grievance-ml","status":"ok","model_version":MODEL_VERSION})
 
 @app.post('/categorize')
 def categorize():
     body = request.get_json(silent=True) or {}
-    text = f"{body.get('title','')} {body.get('description','')}".lower()
-    if 'fraud' in text or 'scam' in text:
-        cat = 'fraud'
-    elif 'payment' in text or 'refund' in text:
-        cat = 'payments'
-    else:
-        cat = 'general'
-    return jsonify(success=True, statusCode=200, category=cat, confidence=0.8)
+    text = body.get('text') or f"{body.get('title','')} {body.get('description','')}"
+    return jsonify(success=True, statusCode=200, model_version=MODEL_VERSION, **engine.predict([text])[0])
+
+@app.post('/categorize/batch')
+def categorize_batch():
+    body = request.get_json(silent=True) or {}
+    texts = body.get('texts')
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return jsonify(success=False, statusCode=400, error="texts must be a list of strings"), 400
+    if len(texts) > MAX_BATCH:
+        return jsonify(success=False, statusCode=413, error=f"at most {MAX_BATCH} texts per batch"), 413
+    return jsonify(success=True, statusCode=200, model_version=MODEL_VERSION, results=engine.predict(texts))
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5002)
@@ -0,0 +1,54 @@
+"""
+Throughput benchmark for the grievance classifier.
+
+    python bench.py --model model.npz            # batch sizes 1..1024, JSON lines on stdout
+"""
+import argparse
+import json
+import sys
+import time
+
+from classifier import ClassifierEngine
+from train import seed_corpus
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure classifier texts/sec across batch sizes")
+    parser.add_argument("--model", default="model.npz")
+    parser.add_argument("--max-batch", type=int, default=1024)
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="minimum measuring time per batch size")
+    args = parser.parse_args(argv)
+
+    engine = ClassifierEngine.load(args.model)
+    corpus = [t for t, _ in seed_corpus(per_category=200, seed=11)]
+    engine.predict(corpus[:8])  # warm-up
+
+    batch = 1
+    while batch <= args.max_batch:
+        texts = (corpus * (batch // len(corpus) + 1))[:batch]
+        n_texts = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        vec_s = 0.0
+        while elapsed < args.min_seconds:
+            t0 = time.perf_counter()
+            X = engine.vectorizer.transform(texts)
+            t1 = time.perf_counter()
+            engine.model.predict_proba(X)
+            vec_s += t1 - t0
+            n_texts += batch
+            elapsed = time.perf_counter() - started
+        print(json.dumps({
+            "batch_size": batch,
+            "texts": n_texts,
+            "seconds": round(elapsed, 4),
+            "texts_per_sec": round(n_texts / elapsed, 1),
+            "vectorize_share": round(vec_s / elapsed, 3),
+            "model_version": engine.version,
+        }))
+        batch *= 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import importlib
+import json
+
+import numpy as np
+import pytest
+
+import train
+from classifier import CATEGORIES, ClassifierEngine, HashingVectorizer, LinearModel
+
+
+@pytest.fixture(scope="module")
+def trained():
+    train_samples, holdout_samples = train.seed_splits(per_category=120, seed=3)
+    return train.train(train_samples, epochs=150, holdout_samples=holdout_samples)
+
+
+def test_vectorizer_rows_are_normalized_and_deterministic():
+    texts = ["UPI transfer of 500 failed", "", "card stolen!!"]
+    X = HashingVectorizer(n_features=2 ** 10).transform(texts)
+    assert X.shape == (3, 2 ** 10) and X.dtype == np.float32
+    assert np.allclose(np.linalg.norm(X[[0, 2]], axis=1), 1.0)
+    assert not X[1].any()
+    assert np.array_equal(X, HashingVectorizer(n_features=2 ** 10).transform(texts))
+
+
+def test_vectorizer_ignores_case_punctuation_and_digit_values():
+    v = HashingVectorizer()
+    a, b = v.transform(["Debited Rs 500 from my account", "debited rs 12999 from my account!"])
+    assert np.array_equal(a, b)
+
+
+def test_batch_and_single_predictions_match(trained):
+    engine, _ = trained
+    texts = [t for t, _ in train.seed_corpus(per_category=3, seed=5)]
+    assert engine.predict(texts) == [engine.predict([t])[0] for t in texts]
+    assert engine.predict([]) == []
+
+
+def _synthetic(scale, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, 5)).astype(np.float32)
+    W = rng.normal(size=(5, 3)).astype(np.float32)
+    y = (X @ W * 3 + rng.gumbel(size=(2000, 3))).argmax(axis=1)
+    return LinearModel(W * scale, np.zeros(3), categories=CATEGORIES[:3]), X, y
+
+
+def test_calibration_sharpens_underconfident_and_softens_overconfident_models():
+    under, X, y = _synthetic(0.5)
+    assert under.calibrate(X, y) < 0.5
+    over, X, y = _synthetic(20.0)
+    assert over.calibrate(X, y) > 3.0
+
+
+def test_calibration_skipped_on_separable_holdout():
+    model = LinearModel(np.eye(3, dtype=np.float32) * 5, np.zeros(3), categories=CATEGORIES[:3])
+    X = np.eye(3, dtype=np.float32).repeat(10, axis=0)
+    y = np.arange(3).repeat(10)
+    assert model.calibrate(X, y) is None
+    assert model.temperature == 1.0
+
+
+def test_seed_training_is_calibrated_on_unseen_templates(trained):
+    engine, report = trained
+    assert report["calibrated"]
+    assert engine.model.temperature == pytest.approx(report["temperature"], abs=1e-4)
+    assert report["temperature"] != 1.0
+    assert report["holdout_accuracy"] < 1.0
+
+
+def test_build_fails_when_calibration_is_skipped(tmp_path):
+    # Every holdout text also appears in training, so the holdout is separable
+    rows = [{"text": f"complaint about {c.replace('_', ' ')}", "category": c} for c in CATEGORIES] * 10
+    data = tmp_path / "separable.jsonl"
+    data.write_text("".join(json.dumps(r) + "\n" for r in rows))
+    out = tmp_path / "model.npz"
+    assert train.main(["--data", str(data), "--out", str(out), "--epochs", "100"]) == 1
+    assert not out.exists()
+    assert train.main(["--data", str(data), "--out", str(out), "--epochs", "100", "--allow-uncalibrated"]) == 0
+    assert out.exists()
+
+
+def test_model_version_follows_weights_and_survives_export(trained, tmp_path):
+    engine, _ = trained
+    path = tmp_path / "model.npz"
+    engine.save(str(path))
+    loaded = ClassifierEngine.load(str(path))
+    assert loaded.version == engine.version
+    assert loaded.predict(["card cloned abroad"]) == engine.predict(["card cloned abroad"])
+    other = LinearModel(engine.model.W, engine.model.b, engine.model.temperature * 2, CATEGORIES)
+    assert ClassifierEngine(engine.vectorizer, other).version != engine.version
+
+
+def test_service_reports_model_version(trained, tmp_path, monkeypatch):
+    engine, _ = trained
+    path = tmp_path / "model.npz"
+    engine.save(str(path))
+    monkeypatch.setenv("MODEL_PATH", str(path))
+    import app as service
+    service = importlib.reload(service)
+    client = service.app.test_client()
+    assert client.get("/health").get_json()["data"]["model_version"] == engine.version
+    single = client.post("/categorize", json={"text": "upi payment failed"}).get_json()
+    batch = client.post("/categorize/batch", json={"texts": ["upi payment failed"]}).get_json()
+    assert single["model_version"] == batch["model_version"] == engine.version
+    assert batch["results"][0] == {"category": single["category"], "confidence": single["confidence"]}
@@ -0,0 +1,204 @@
+"""
+Train and export the grievance classifier.
+
+    python train.py --out model.npz                 # built-in seed corpus
+    python train.py --data labeled.jsonl --out model.npz
+
+`--data` is NDJSON with {"text": ..., "category": ...} per line, category from classifier.CATEGORIES.
+The temperature is fitted on a holdout (for the seed corpus: whole templates the model never saw), then the
+model is refitted on all samples. Training fails if the holdout cannot calibrate the model.
+"""
+import argparse
+import json
+import random
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from classifier import CATEGORIES, ClassifierEngine, HashingVectorizer, LinearModel
+
+# Seed corpus: templated complaints per category, expanded with slot fillers
+_TEMPLATES = {
+    "unauthorized_debit": [
+        "money debited from my account without my permission",
+        "unauthorized debit of rs {amt} from my {acct} account",
+        "amount {amt} deducted from account but i did not make this transaction",
+        "someone debited {amt} from my account i never authorized it",
+        "auto debit happened without mandate please reverse {amt}",
+        "unknown deduction of {amt} seen in my {acct} statement",
+    ],
+    "loan_dispute": [
+        "loan emi charged twice this month",
+        "wrong interest rate applied on my {loan} loan",
+        "bank is charging extra penalty on my {loan} loan emi",
+        "foreclosure charges on {loan} loan are not as agreed",
+        "loan statement shows outstanding {amt} which is incorrect",
+        "recovery agents harassing me about {loan} loan already paid",
+    ],
+    "account_closure": [
+        "i want to close my {acct} account but branch is not processing",
+        "account closure request pending for {days} days",
+        "closed my account but still charged maintenance fee",
+        "please close my {acct} account and transfer the balance",
+        "account not closed even after submitting closure form",
+        "bank refusing to close my account without reason",
+    ],
+    "failed_transfer": [
+        "money debited but transfer failed",
+        "{mode} transfer of {amt} failed but amount not refunded",
+        "transaction failed and money not credited to beneficiary",
+        "{mode} payment pending for {days} days amount deducted",
+        "fund transfer unsuccessful but balance reduced by {amt}",
+        "sent {amt} via {mode} but receiver did not get it",
+    ],
+    "card_fraud": [
+        "fraud transaction on my {card} card",
+        "my {card} card was used for purchases i did not make",
+        "card cloned and {amt} spent abroad",
+        "received otp for card transaction i never initiated fraud",
+        "{card} card stolen and fraudulent charges of {amt}",
+        "scam call asked card details and then money was taken from card",
+    ],
+    "digital_service_issue": [
+        "mobile banking app not working",
+        "cannot login to net banking {days} days",
+        "{app} app crashes when i try to pay",
+        "otp not received for internet banking login",
+        "unable to reset password on {app} app",
+        "website showing error during login to my account",
+    ],
+    "other": [
+        "branch staff was rude to me",
+        "need a new cheque book",
+        "want to update my address in records",
+        "queue at branch is too long",
+        "request for account statement copy",
+        "general feedback about customer service",
+    ],
+}
+_SLOTS = {
+    "amt": ["500", "1,200", "25000", "rs 999", "3500.50", "10k"],
+    "acct": ["savings", "current", "salary", "joint", "nre"],
+    "loan": ["home", "personal", "car", "education", "gold"],
+    "days": ["2", "5", "10", "15", "30"],
+    "mode": ["upi", "neft", "imps", "rtgs"],
+    "card": ["credit", "debit", "visa", "master"],
+    "app": ["mobile banking", "upi", "yono", "wallet"],
+}
+_NOISE = ["", "please help", "urgent", "kindly resolve asap", "this is very frustrating", "sir"]
+
+
+def _expand(template: str, rng: random.Random) -> str:
+    text = template
+    for slot, values in _SLOTS.items():
+        text = text.replace("{" + slot + "}", rng.choice(values))
+    noise = rng.choice(_NOISE)
+    return f"{text} {noise}".strip() if rng.random() < 0.5 else f"{noise} {text}".strip()
+
+
+def seed_corpus(per_category: int = 300, seed: int = 7) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    out = []
+    for cat, templates in _TEMPLATES.items():
+        for _ in range(per_category):
+            out.append((_expand(rng.choice(templates), rng), cat))
+    rng.shuffle(out)
+    return out
+
+
+def seed_splits(per_category: int = 300, seed: int = 7) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Seed corpus split by template: one template per category is held out entirely.
+    Slot-filled variants of a template are near-duplicates, so a random split would leave the
+    holdout separable and say nothing about confidence on unseen phrasing.
+    """
+    rng = random.Random(seed)
+    train_samples, holdout_samples = [], []
+    for cat, templates in _TEMPLATES.items():
+        held = rng.randrange(len(templates))
+        for _ in range(per_category):
+            k = rng.randrange(len(templates))
+            (holdout_samples if k == held else train_samples).append((_expand(templates[k], rng), cat))
+    rng.shuffle(train_samples)
+    rng.shuffle(holdout_samples)
+    return train_samples, holdout_samples
+
+
+def load_ndjson(path: str) -> List[Tuple[str, str]]:
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                if rec["category"] not in CATEGORIES:
+                    raise ValueError(f"unknown category {rec['category']!r}")
+                out.append((rec["text"], rec["category"]))
+    return out
+
+
+def train(
+    samples: List[Tuple[str, str]],
+    holdout: float = 0.2,
+    epochs: int = 300,
+    holdout_samples: Optional[List[Tuple[str, str]]] = None,
+) -> Tuple[ClassifierEngine, dict]:
+    """
+    Fit on `samples` minus the holdout, calibrate the temperature on the holdout, then refit on
+    everything and keep that temperature. `holdout_samples` replaces the random `holdout` fraction.
+    """
+    if holdout_samples is None:
+        split = int(len(samples) * (1 - holdout))
+        samples, holdout_samples = samples[:split], samples[split:]
+    vectorizer = HashingVectorizer()
+    X = vectorizer.transform([t for t, _ in samples])
+    y = np.array([CATEGORIES.index(c) for _, c in samples])
+    X_held = vectorizer.transform([t for t, _ in holdout_samples])
+    y_held = np.array([CATEGORIES.index(c) for _, c in holdout_samples])
+
+    model = LinearModel.fit(X, y, len(CATEGORIES), epochs=epochs)
+    temperature = model.calibrate(X_held, y_held)
+    P = model.predict_proba(X_held)
+    report = {
+        "train": len(samples),
+        "holdout": len(holdout_samples),
+        "holdout_accuracy": round(float((P.argmax(axis=1) == y_held).mean()), 4),
+        "holdout_mean_confidence": round(float(P.max(axis=1).mean()), 4),
+        "temperature": round(model.temperature, 4),
+        "calibrated": temperature is not None,
+    }
+    final = LinearModel.fit(np.vstack([X, X_held]), np.concatenate([y, y_held]), len(CATEGORIES), epochs=epochs)
+    final.temperature = model.temperature
+    return ClassifierEngine(vectorizer, final), report
+
+
+def train_seed(epochs: int = 300) -> Tuple[ClassifierEngine, dict]:
+    train_samples, holdout_samples = seed_splits()
+    return train(train_samples, epochs=epochs, holdout_samples=holdout_samples)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train the grievance classifier and export it as .npz")
+    parser.add_argument("--data", help="NDJSON training data; defaults to the built-in seed corpus")
+    parser.add_argument("--out", default="model.npz")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--allow-uncalibrated", action="store_true",
+                        help="export even if the holdout is separable and no temperature could be fitted")
+    args = parser.parse_args(argv)
+
+    if args.data:
+        engine, report = train(load_ndjson(args.data), epochs=args.epochs)
+    else:
+        engine, report = train_seed(epochs=args.epochs)
+    if not report["calibrated"] and not args.allow_uncalibrated:
+        print(json.dumps(report), file=sys.stderr)
+        print("holdout is separable, confidences would be uncalibrated; use a harder holdout or --allow-uncalibrated",
+              file=sys.stderr)
+        return 1
+    engine.save(args.out)
+    print(json.dumps({**report, "version": engine.version, "out": args.out}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
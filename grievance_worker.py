@@ -0,0 +1,250 @@
+"""
+Background categorization of filed grievances.
+- Intake inserts rows with category 'pending' and returns immediately
+- Workers lease a batch of pending rows in one short transaction (claimed_until, attempts += 1), categorize
+  them with no locks or pooled connection held, then write category/urgency in a second transaction
+- A failed batch is retried after GRIEVANCE_WORKER_RETRY_SECONDS; rows that fail
+  GRIEVANCE_WORKER_MAX_ATTEMPTS times fall back to 'other', so a bad batch cannot stall the queue
+- Run in-process (GRIEVANCE_WORKERS threads) or standalone: python grievance_worker.py --workers N
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+import psycopg2.extras
+
+from categorizer import categorizer
+from database import statement, transaction
+
+logger = logging.getLogger("trustguard")
+
+PENDING = "pending"
+CATEGORIES = [
+    "unauthorized_debit",
+    "loan_dispute",
+    "account_closure",
+    "failed_transfer",
+    "card_fraud",
+    "digital_service_issue",
+    "other",
+]
+
+# In-process worker threads started with the API; 0 leaves categorization to standalone workers
+GRIEVANCE_WORKERS = int(os.getenv("GRIEVANCE_WORKERS", "1"))
+GRIEVANCE_WORKER_BATCH = int(os.getenv("GRIEVANCE_WORKER_BATCH", "64"))
+# Idle workers re-check the queue this often (in-process workers are also woken by intake)
+GRIEVANCE_WORKER_POLL_SECONDS = float(os.getenv("GRIEVANCE_WORKER_POLL_SECONDS", "1"))
+# Failed rows become claimable again after this long
+GRIEVANCE_WORKER_RETRY_SECONDS = float(os.getenv("GRIEVANCE_WORKER_RETRY_SECONDS", "5"))
+# A claim expires after this long, so rows of a crashed worker return to the queue
+GRIEVANCE_WORKER_LEASE_SECONDS = float(os.getenv("GRIEVANCE_WORKER_LEASE_SECONDS", "60"))
+# After this many failed attempts a row is filed under 'other' (as if grievance-ml were down at intake)
+GRIEVANCE_WORKER_MAX_ATTEMPTS = int(os.getenv("GRIEVANCE_WORKER_MAX_ATTEMPTS", "5"))
+FALLBACK_CATEGORY = "other"
+
+_CLAIM = statement(
+    "grievance_claim_pending",
+    """
+    UPDATE grievances AS g
+    SET categorize_attempts = g.categorize_attempts + 1,
+        claimed_until = NOW() + make_interval(secs => %s)
+    FROM (
+        SELECT id FROM grievances
+        WHERE category = 'pending' AND (claimed_until IS NULL OR claimed_until < NOW())
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ) AS c
+    WHERE g.id = c.id
+    RETURNING g.id, g.text, g.categorize_attempts
+    """,
+)
+
+# updated_at is left alone: it feeds resolution-time analytics. The category guard skips rows another
+# worker finished after this worker's lease expired
+_APPLY = """
+    UPDATE grievances AS g SET category = v.category, urgency = v.urgency, claimed_until = NULL
+    FROM (VALUES %s) AS v(id, category, urgency)
+    WHERE g.id = v.id AND g.category = 'pending'
+"""
+
+_RELEASE = """
+    UPDATE grievances SET claimed_until = NOW() + make_interval(secs => %s)
+    WHERE id = ANY(%s) AND category = 'pending'
+"""
+
+
+def urgency_for(category: str, text: str) -> str:
+    lowered = text.lower()
+    if category in ("card_fraud", "unauthorized_debit") or "fraud" in lowered or "debit" in lowered:
+        return "HIGH"
+    return "MEDIUM"
+
+
+def _apply(values) -> None:
+    with transaction() as cur:
+        psycopg2.extras.execute_values(cur, _APPLY, values)
+
+
+def process_batch(limit: int = GRIEVANCE_WORKER_BATCH) -> int:
+    """Categorize up to `limit` pending grievances; returns the number claimed. Raises if categorization failed."""
+    with transaction() as cur:
+        _CLAIM.run(cur, [GRIEVANCE_WORKER_LEASE_SECONDS, limit])
+        rows = cur.fetchall()
+    if not rows:
+        return 0
+    try:
+        results = categorizer.categorize_many([r["text"] for r in rows])
+        if len(results) != len(rows):
+            raise ValueError(f"categorizer returned {len(results)} results for {len(rows)} texts")
+    except Exception:
+        exhausted = [r for r in rows if r["categorize_attempts"] >= GRIEVANCE_WORKER_MAX_ATTEMPTS]
+        if exhausted:
+            logger.warning("filing %s grievances under %r after %s failed attempts", len(exhausted), FALLBACK_CATEGORY, GRIEVANCE_WORKER_MAX_ATTEMPTS)
+            _apply([(r["id"], FALLBACK_CATEGORY, urgency_for(FALLBACK_CATEGORY, r["text"])) for r in exhausted])
+        retry = [r["id"] for r in rows if r["categorize_attempts"] < GRIEVANCE_WORKER_MAX_ATTEMPTS]
+        if retry:
+            with transaction() as cur:
+                cur.execute(_RELEASE, [GRIEVANCE_WORKER_RETRY_SECONDS, retry])
+        raise
+    values = []
+    for row, result in zip(rows, results):
+        category = result.get("category")
+        if category not in CATEGORIES:
+            category = FALLBACK_CATEGORY
+        values.append((row["id"], category, urgency_for(category, row["text"])))
+    _apply(values)
+    return len(rows)
+
+
+class GrievanceWorkers:
+    """Thread pool draining the pending queue inside the API process."""
+
+    def __init__(self, threads: int = GRIEVANCE_WORKERS, batch: int = GRIEVANCE_WORKER_BATCH):
+        self.threads = threads
+        self.batch = batch
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.batches = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.threads):
+            t = threading.Thread(target=self._run, name=f"grievance-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        """Called after intake so an idle worker picks the row up without waiting for the poll interval."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                n = process_batch(self.batch)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.warning("grievance worker batch failed: %s", str(e))
+                self._stop.wait(GRIEVANCE_WORKER_RETRY_SECONDS)
+                continue
+            if n:
+                with self._lock:
+                    self.processed += n
+                    self.batches += 1
+                if n == self.batch:
+                    continue
+            self._wake.wait(GRIEVANCE_WORKER_POLL_SECONDS)
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "batch": self.batch,
+                "processed": self.processed,
+                "batches": self.batches,
+                "errors": self.errors,
+            }
+
+
+workers = GrievanceWorkers()
+
+
+def _worker_process(batch: int) -> None:
+    logging.basicConfig(level=logging.INFO)
+    pool = GrievanceWorkers(threads=1, batch=batch)
+    done = threading.Event()
+
+    def _shutdown(signum, frame):
+        done.set()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+    pool.start()
+    done.wait()
+    pool.stop()
+    logger.info("grievance worker pid=%s stopped: %s", os.getpid(), pool.stats())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Categorize pending grievances")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--batch", type=int, default=GRIEVANCE_WORKER_BATCH, help="rows claimed per transaction")
+    parser.add_argument("--once", action="store_true", help="drain the queue in this process and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.once:
+        total = 0
+        while True:
+            try:
+                n = process_batch(args.batch)
+            except Exception as e:
+                # The failed rows are leased for GRIEVANCE_WORKER_RETRY_SECONDS; carry on with the rest
+                logger.warning("grievance worker batch failed: %s", str(e))
+                continue
+            total += n
+            if n < args.batch:
+                break
+        print(total)
+        return 0
+
+    # spawn: each process opens its own pool instead of inheriting the parent's sockets
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_worker_process, args=(args.batch,), name=f"grievance-worker-{i}") for i in range(args.workers)]
+    for p in procs:
+        p.start()
+
+    def _forward(signum, frame):
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for p in procs:
+        p.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+k-sortable 63-bit IDs generated in-process, without a database round-trip.
+- Layout: 41 bits milliseconds since ID_EPOCH | 10 bits worker id | 12 bits sequence
+- IDs from one worker are strictly increasing; across workers they sort by time (to the millisecond)
+- Worker ids are never guessed: each host/container/replica sets a unique ID_NODE_ID and its processes
+  claim a slot under it with lock files in ID_LOCK_DIR (local to the replica is fine); worker id is
+  node << ID_PROCESS_BITS | slot. ID_WORKER_ID instead pins the full worker id of a single process
+- Tolerates the wall clock stepping backwards by continuing from the last issued timestamp
+"""
+import os
+import tempfile
+import threading
+import time
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+# 2024-01-01T00:00:00Z; 41 bits of milliseconds lasts until 2093
+ID_EPOCH_MS = 1704067200000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+TIMESTAMP_SHIFT = WORKER_BITS + SEQUENCE_BITS
+
+ID_LOCK_DIR = os.getenv("ID_LOCK_DIR", os.path.join(tempfile.gettempdir(), "trustguard-ids"))
+
+# Crockford base32: fixed-width encodings sort in the same order as the integers
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ENCODED_LEN = 13
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000 - ID_EPOCH_MS
+
+
+def _claim_worker_id():
+    """Returns (worker_id, lock_fd). The lock is held for the life of the process and is not inherited by forks."""
+    configured = os.getenv("ID_WORKER_ID")
+    if configured is not None:
+        worker_id = int(configured)
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"ID_WORKER_ID must be between 0 and {MAX_WORKER_ID}")
+        return worker_id, None
+    node = os.getenv("ID_NODE_ID")
+    if node is None:
+        raise RuntimeError("set ID_NODE_ID (unique per host/container/replica) or ID_WORKER_ID (unique per process)")
+    process_bits = int(os.getenv("ID_PROCESS_BITS", "4"))
+    if not 0 <= process_bits <= WORKER_BITS:
+        raise ValueError(f"ID_PROCESS_BITS must be between 0 and {WORKER_BITS}")
+    node_id = int(node)
+    max_node = (1 << (WORKER_BITS - process_bits)) - 1
+    if not 0 <= node_id <= max_node:
+        raise ValueError(f"ID_NODE_ID must be between 0 and {max_node} with ID_PROCESS_BITS={process_bits}")
+    if fcntl is None:
+        raise RuntimeError("claiming a process slot needs fcntl; set ID_WORKER_ID per process instead")
+    os.makedirs(ID_LOCK_DIR, exist_ok=True)
+    for slot in range(1 << process_bits):
+        fd = os.open(os.path.join(ID_LOCK_DIR, f"node-{node_id}-slot-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return (node_id << process_bits) | slot, fd
+        except OSError:
+            os.close(fd)
+    raise RuntimeError(f"all {1 << process_bits} process slots of node {node_id} in {ID_LOCK_DIR} are in use")
+
+
+class IdGenerator:
+    """Thread-safe generator for one process; see the module docstring for the bit layout."""
+
+    def __init__(self, worker_id: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._lock_fd = None
+        if worker_id is None:
+            worker_id, self._lock_fd = _claim_worker_id()
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._last_ms = -1
+        self._sequence = 0
+        self.clock_rollbacks = 0
+
+    def _advance(self) -> int:
+        # Caller holds self._lock
+        now = _now_ms()
+        if now > self._last_ms:
+            self._last_ms = now
+            self._sequence = 0
+        else:
+            if now < self._last_ms:
+                self.clock_rollbacks += 1
+            self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+            if self._sequence == 0:
+                if now < self._last_ms:
+                    # Clock is behind: borrow the next millisecond rather than block until it catches up
+                    self._last_ms += 1
+                else:
+                    # 4096 IDs issued this millisecond; wait for the next one
+                    while now <= self._last_ms:
+                        now = _now_ms()
+                    self._last_ms = now
+        return (self._last_ms << TIMESTAMP_SHIFT) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self) -> int:
+        with self._lock:
+            return self._advance()
+
+    def next_ids(self, n: int) -> List[int]:
+        """`n` increasing IDs under one lock acquisition (for pre-allocating batches)."""
+        out: List[int] = []
+        with self._lock:
+            while len(out) < n:
+                first = self._advance()
+                out.append(first)
+                # The rest of this millisecond's sequence space is a contiguous range
+                room = min(SEQUENCE_MASK - self._sequence, n - len(out))
+                if room:
+                    out.extend(range(first + 1, first + 1 + room))
+                    self._sequence += room
+        return out
+
+
+def encode(value: int) -> str:
+    """Fixed-width Crockford base32; lexicographic order matches numeric order."""
+    chars = []
+    for _ in range(_ENCODED_LEN):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def decode(text: str) -> int:
+    value = 0
+    for ch in text.upper():
+        value = (value << 5) | _ALPHABET.index(ch)
+    return value
+
+
+def timestamp_ms(value: int) -> int:
+    """Unix epoch milliseconds embedded in an ID."""
+    return (value >> TIMESTAMP_SHIFT) + ID_EPOCH_MS
+
+
+_generator: Optional[IdGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def generator() -> IdGenerator:
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = IdGenerator()
+    return _generator
+
+
+def next_id() -> int:
+    return generator().next_id()
+
+
+def next_ids(n: int) -> List[int]:
+    return generator().next_ids(n)
+
+
+def _reset_after_fork() -> None:
+    # A forked child shares the parent's worker id but not its lock; claim a fresh one lazily
+    global _generator, _generator_lock
+    _generator = None
+    _generator_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,28 +1,48 @@
 import os
 import time
+import asyncio
 import hashlib
 import logging
+import json
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-import requests
-from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, status
+from fastapi import APIRouter, FastAPI, UploadFile, File, Form, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 from dotenv import load_dotenv
-import bcrypt
 import jwt
 
-from database import fetchone, fetchall, execute
+from database import fetchone, fetchall, execute, pool_stats, Statement, statement, statement_stats
+import async_database as adb
+import ml_client
+from ml_client import identity_client
+from categorizer import categorizer
+from grievance_worker import CATEGORIES, PENDING, urgency_for, workers as grievance_workers
+from uploads import (
+    IDENTITY_MAX_VIDEO_BYTES,
+    SpooledUploadRoute,
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    multipart_file_body,
+    sha256_upload,
+)
+from cache import SWRCache, TTLCache
+import analytics
+import auth_cache
+import passwords
+from write_buffer import IDENTITY_WRITE_SYNC, IDENTITY_WRITE_SYNC_TIMEOUT, WriteBufferFull, identity_writer
+import ids
+import metrics
+from registry_import import RegistryImportError, detect_format, import_registry
+from app_registry import registry, verdict_from_rows, resolve_from_rows, OFFICIAL_COLUMNS, SUSPICIOUS_COLUMNS
 
 load_dotenv()
 
 # ----- Config -----
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
 JWT_EXPIRES_HOURS = int(os.getenv("JWT_EXPIRES_HOURS", "24"))
-IDENTITY_SERVICE_URL = os.getenv("IDENTITY_SERVICE_URL", "http://localhost:5001")
-GRIEVANCE_SERVICE_URL = os.getenv("GRIEVANCE_SERVICE_URL", "http://localhost:5002")
 
 origins = os.getenv("CORS_ALLOW_ORIGINS", "*").split(",")
 
@@ -40,6 +60,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads from Content-Length, or while a chunked body is still streaming in
+UPLOAD_LIMITS = {"/api/identity/verify": IDENTITY_MAX_VIDEO_BYTES}
+app.add_middleware(UploadLimitMiddleware, limits=UPLOAD_LIMITS)
+
+# Added last so it is outermost and also times responses from the middlewares above
+app.add_middleware(metrics.MetricsMiddleware)
+
+_background_tasks = []
+
+@app.on_event("startup")
+async def on_startup():
+    # Fails startup when neither ID_NODE_ID nor ID_WORKER_ID is configured
+    ids.generator()
+    await adb.open_pool()
+    # Listener thread loads the registry index and keeps it current via LISTEN/NOTIFY
+    registry.start()
+    grievance_workers.start()
+    passwords.hasher.start()
+    identity_writer.start()
+    _background_tasks.append(asyncio.create_task(ml_client.probe_loop()))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    registry.stop()
+    grievance_workers.stop()
+    passwords.hasher.shutdown()
+    # Drain buffered identity checks before the pools close
+    await asyncio.to_thread(identity_writer.stop)
+    await adb.close_pool()
+    await ml_client.aclose_all()
+    ml_client.close_all()
+
 # ----- Security -----
 security = HTTPBearer()
 
@@ -61,7 +115,8 @@ def verify_token(token: str) -> Dict[str, Any]:
 def auth_dependency(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials or not credentials.credentials:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
-    return verify_token(credentials.credentials)
+    # Signature checks run once per token; repeat requests reuse the verified claims until exp
+    return auth_cache.verified_claims(credentials.credentials, verify_token)
 
 # ----- Helpers -----
 
@@ -85,6 +140,16 @@ class FileGrievanceDto(BaseModel):
 class CategorizeDto(BaseModel):
     text: str
 
+class CategorizeBatchDto(BaseModel):
+    texts: List[str]
+
+class AppVerifyItem(BaseModel):
+    package_name: Optional[str] = None
+    sha256_hash: Optional[str] = None
+
+class AppVerifyBatchDto(BaseModel):
+    items: List[AppVerifyItem]
+
 # ----- Root & Health -----
 @app.get("/")
 def root():
@@ -97,21 +162,71 @@ def health():
         db_ok = True
     except Exception:
         db_ok = False
-    return api_success({"status": "OK", "db": db_ok})
+    return api_success({"status": "OK", "db": db_ok, "db_pool": pool_stats(), "async_db_pool": adb.pool_stats()})
+
+@app.get("/health/ml")
+def health_ml():
+    return api_success(ml_client.breaker_states())
+
+@app.get("/health/caches")
+def health_caches():
+    return api_success({
+        "app_verdicts": app_verdict_cache.stats(),
+        "analytics_closed_buckets": analytics.closed_buckets.stats(),
+        "grievance_analytics": analytics_cache.stats(),
+        "categorizations": categorizer.stats(),
+        "auth_tokens": auth_cache.token_cache.stats(),
+        "user_profiles": auth_cache.profile_cache.stats(),
+    })
+
+@app.get("/health/registry")
+def health_registry():
+    return api_success(registry.stats())
+
+# Literal, not a parameter: a generic plan for a prepared statement must still match idx_grievances_pending
+_PENDING_COUNT = statement("grievance_pending_count", f"SELECT COUNT(*) AS n FROM grievances WHERE category = '{PENDING}'")
+
+@app.get("/health/statements")
+def health_statements():
+    return api_success(statement_stats())
+
+@app.get("/health/writes")
+def health_writes():
+    return api_success({"identity_checks": identity_writer.stats()})
+
+@app.get("/health/workers")
+def health_workers():
+    pending = fetchone(_PENDING_COUNT)
+    return api_success({**grievance_workers.stats(), "pending": pending["n"]})
+
+@app.get("/health/passwords")
+def health_passwords():
+    return api_success(passwords.hasher.stats())
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 # ----- Auth Endpoints -----
+_USER_ID_BY_EMAIL = "SELECT id FROM users WHERE lower(email)=lower(%s)"
+_USER_BY_EMAIL = "SELECT id, email, password, name FROM users WHERE lower(email)=lower(%s)"
+
 @app.post("/api/auth/register")
-def register(dto: RegisterDto):
+async def register(dto: RegisterDto):
     start = time.time()
-    existing = fetchone("SELECT id FROM users WHERE lower(email)=lower(%s)", [dto.email])
+    existing = await adb.fetchone(_USER_ID_BY_EMAIL, [dto.email])
     if existing:
         raise HTTPException(status_code=409, detail="Email already registered")
-    salt = bcrypt.gensalt(rounds=10)
-    hashed = bcrypt.hashpw(dto.password.encode("utf-8"), salt).decode("utf-8")
-    user = fetchone(
+    try:
+        hashed = await passwords.hasher.hash(dto.password)
+    except passwords.PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    user = await adb.fetchone(
         "INSERT INTO users(email, password, name) VALUES(%s,%s,%s) RETURNING id, email, name",
         [dto.email.lower(), hashed, dto.name],
     )
+    auth_cache.invalidate_user(user["id"])
     token = create_token({"sub": str(user["id"]), "email": user["email"]})
     latency_ms = int((time.time() - start) * 1000)
     logger.info("register success %s", dto.email)
@@ -122,13 +237,25 @@ def register(dto: RegisterDto):
     })
 
 @app.post("/api/auth/login")
-def login(dto: LoginDto):
+async def login(dto: LoginDto):
     start = time.time()
-    user = fetchone("SELECT id, email, password, name FROM users WHERE lower(email)=lower(%s)", [dto.email])
+    user = await adb.fetchone(_USER_BY_EMAIL, [dto.email])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not bcrypt.checkpw(dto.password.encode("utf-8"), user["password"].encode("utf-8")):
+    try:
+        valid = await passwords.hasher.check(dto.password, user["password"])
+    except passwords.PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid password")
+    if passwords.needs_rehash(user["password"]):
+        # Cost changed since this hash was made; upgrade it now that we have the plaintext
+        try:
+            rehashed = await passwords.hasher.hash(dto.password)
+            await adb.execute("UPDATE users SET password=%s WHERE id=%s AND password=%s", [rehashed, user["id"], user["password"]])
+            auth_cache.invalidate_user(user["id"])
+        except passwords.PasswordPoolBusy:
+            pass
     token = create_token({"sub": str(user["id"]), "email": user["email"]})
     latency_ms = int((time.time() - start) * 1000)
     logger.info("login success %s", dto.email)
@@ -138,59 +265,89 @@ def login(dto: LoginDto):
         "latency_ms": latency_ms,
     })
 
+_USER_BY_ID = statement("user_by_id", "SELECT id, email, name FROM users WHERE id=%s")
+
 @app.get("/api/auth/me")
 def me(claims: Dict[str, Any] = Depends(auth_dependency)):
-    user = fetchone("SELECT id, email, name FROM users WHERE id=%s", [int(claims["sub"])])
+    user = auth_cache.user_profile(
+        int(claims["sub"]),
+        lambda user_id: fetchone(_USER_BY_ID, [user_id]),
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return api_success({"id": user["id"], "email": user["email"], "name": user["name"]})
 
 # ----- Identity Verification -----
-@app.post("/api/identity/verify")
+# Video uploads spool to disk past UPLOAD_SPOOL_MAX_BYTES; other routes keep Starlette's default
+identity_router = APIRouter(route_class=SpooledUploadRoute)
+
+@identity_router.post("/api/identity/verify")
 async def identity_verify(video: UploadFile = File(...), claims: Dict[str, Any] = Depends(auth_dependency)):
     start = time.time()
     try:
-        files = {"video": (video.filename, await video.read(), video.content_type or "application/octet-stream")}
+        # Stream the (disk-spooled) upload to identity-ml in chunks instead of buffering it
+        headers, body = multipart_file_body("video", video, max_bytes=IDENTITY_MAX_VIDEO_BYTES)
         try:
-            resp = requests.post(f"{IDENTITY_SERVICE_URL}/predict", files=files, timeout=30)
-            if resp.status_code == 200:
-                payload = resp.json()
-            else:
-                raise Exception(f"ML service error {resp.status_code}")
+            payload = await identity_client.apost_json("/predict", body_factory=body, headers=headers)
+        except UploadTooLarge:
+            raise
         except Exception as e:
             logger.warning("Identity ML service unavailable, using fallback: %s", str(e))
             payload = {"deepfake_score": 0.15, "liveness_status": "PASS", "overall_result": "VERIFIED"}
         latency_ms = int((time.time() - start) * 1000)
         payload["latency_ms"] = payload.get("latency_ms", latency_ms)
-        # Persist
-        row = fetchone(
-            """
-            INSERT INTO identity_checks(user_id, deepfake_score, liveness_status, overall_result, latency_ms)
-            VALUES(%s,%s,%s,%s,%s)
-            RETURNING id
-            """,
-            [int(claims["sub"]), float(payload.get("deepfake_score", 0.0)), payload.get("liveness_status", "PASS"), payload.get("overall_result", "VERIFIED"), int(payload.get("latency_ms", latency_ms))],
+        # Persist: buffered multi-row INSERT; the id is allocated now so we don't wait for the flush
+        values = dict(
+            user_id=int(claims["sub"]),
+            deepfake_score=float(payload.get("deepfake_score", 0.0)),
+            liveness_status=payload.get("liveness_status", "PASS"),
+            overall_result=payload.get("overall_result", "VERIFIED"),
+            latency_ms=int(payload.get("latency_ms", latency_ms)),
         )
-        payload["id"] = row["id"]
+        try:
+            row = identity_writer.add(**values)
+            if IDENTITY_WRITE_SYNC:
+                flushed = await asyncio.to_thread(identity_writer.wait_flushed, row["id"], IDENTITY_WRITE_SYNC_TIMEOUT)
+                if not flushed:
+                    raise HTTPException(status_code=503, detail="identity check could not be saved, try again")
+        except WriteBufferFull:
+            row = await adb.fetchone(
+                """
+                INSERT INTO identity_checks(id, user_id, deepfake_score, liveness_status, overall_result, latency_ms)
+                VALUES(%s,%s,%s,%s,%s,%s)
+                RETURNING id
+                """,
+                [ids.next_id(), values["user_id"], values["deepfake_score"], values["liveness_status"], values["overall_result"], values["latency_ms"]],
+            )
+        # 63-bit ids lose precision as JSON numbers in JavaScript clients
+        payload["id"] = str(row["id"])
         logger.info("identity verification completed user=%s result=%s", claims.get("sub"), payload.get("overall_result"))
         return api_success(payload)
     except HTTPException:
         raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         logger.exception("identity verify error")
         raise HTTPException(status_code=500, detail=str(e))
 
+_IDENTITY_RESULT = statement(
+    "identity_result",
+    "SELECT id, deepfake_score, liveness_status, overall_result, latency_ms, created_at FROM identity_checks WHERE id=%s AND user_id=%s",
+)
+
 @app.get("/api/identity/result/{id}")
 def identity_result(id: int, claims: Dict[str, Any] = Depends(auth_dependency)):
     try:
-        doc = fetchone(
-            "SELECT id, deepfake_score, liveness_status, overall_result, latency_ms, created_at FROM identity_checks WHERE id=%s AND user_id=%s",
-            [id, int(claims["sub"])],
-        )
+        doc = identity_writer.pending(id)
+        if doc is not None and doc["user_id"] != int(claims["sub"]):
+            doc = None
+        elif doc is None:
+            doc = fetchone(_IDENTITY_RESULT, [id, int(claims["sub"])])
         if not doc:
             raise HTTPException(status_code=404, detail="Result not found")
         data = {
-            "id": doc["id"],
+            "id": str(doc["id"]),
             "deepfake_score": doc["deepfake_score"],
             "liveness_status": doc["liveness_status"],
             "overall_result": doc["overall_result"],
@@ -204,7 +361,37 @@ def identity_result(id: int, claims: Dict[str, Any] = Depends(auth_dependency)):
         logger.exception("identity result error")
         raise HTTPException(status_code=500, detail=str(e))
 
+app.include_router(identity_router)
+
 # ----- App Authenticator -----
+APP_VERDICT_CACHE_SIZE = int(os.getenv("APP_VERDICT_CACHE_SIZE", "10000"))
+APP_VERDICT_CACHE_TTL = float(os.getenv("APP_VERDICT_CACHE_TTL", "300"))
+# (sha256_hash, package_name) -> final verdict; cleared whenever the registry index changes
+app_verdict_cache = TTLCache("app_verdicts", maxsize=APP_VERDICT_CACHE_SIZE, ttl=APP_VERDICT_CACHE_TTL)
+registry.on_change(app_verdict_cache.clear)
+
+_OFFICIAL_BY_PACKAGE_OR_HASH = "SELECT * FROM official_apps WHERE package_name=%s OR sha256_hash=%s LIMIT 1"
+_OFFICIAL_BY_PACKAGE = "SELECT * FROM official_apps WHERE package_name=%s LIMIT 1"
+_OFFICIAL_BY_HASH = "SELECT * FROM official_apps WHERE sha256_hash=%s LIMIT 1"
+_SUSPICIOUS_BY_PACKAGE = "SELECT * FROM suspicious_apps WHERE package_name=%s LIMIT 1"
+
+async def _lookup_app_verdict(package_name: Optional[str], sha256_hash: Optional[str]) -> Dict[str, Any]:
+    # Served from the in-memory registry index; the DB is only consulted until it has loaded
+    if registry.ready:
+        return registry.lookup(package_name, sha256_hash)
+    official = None
+    if package_name or sha256_hash:
+        if package_name and sha256_hash:
+            official = await adb.fetchone(_OFFICIAL_BY_PACKAGE_OR_HASH, [package_name, sha256_hash])
+        elif package_name:
+            official = await adb.fetchone(_OFFICIAL_BY_PACKAGE, [package_name])
+        elif sha256_hash:
+            official = await adb.fetchone(_OFFICIAL_BY_HASH, [sha256_hash])
+    suspicious = None
+    if not official and package_name:
+        suspicious = await adb.fetchone(_SUSPICIOUS_BY_PACKAGE, [package_name])
+    return verdict_from_rows(official, suspicious)
+
 @app.post("/api/app/verify")
 async def app_verify(
     package_name: Optional[str] = Form(None),
@@ -212,61 +399,139 @@ async def app_verify(
     claims: Dict[str, Any] = Depends(auth_dependency),
 ):
     start = time.time()
-    status_label = "UNKNOWN"
-    publisher = None
-    google_play_link = None
-    confidence = 0.5
 
     try:
         sha256_hash = None
         if apk is not None:
-            content = await apk.read()
-            sha256_hash = hashlib.sha256(content).hexdigest()
-        official = None
-        if package_name or sha256_hash:
-            if package_name and sha256_hash:
-                official = fetchone("SELECT * FROM official_apps WHERE package_name=%s OR sha256_hash=%s LIMIT 1", [package_name, sha256_hash])
-            elif package_name:
-                official = fetchone("SELECT * FROM official_apps WHERE package_name=%s LIMIT 1", [package_name])
-            elif sha256_hash:
-                official = fetchone("SELECT * FROM official_apps WHERE sha256_hash=%s LIMIT 1", [sha256_hash])
-        if official:
-            status_label = "OFFICIAL"
-            publisher = official.get("publisher")
-            google_play_link = official.get("google_play_link")
-            confidence = 0.98
-        else:
-            suspicious = None
-            if package_name:
-                suspicious = fetchone("SELECT * FROM suspicious_apps WHERE package_name=%s LIMIT 1", [package_name])
-            if suspicious:
-                status_label = "SUSPICIOUS"
-                publisher = suspicious.get("publisher")
-                google_play_link = suspicious.get("google_play_link")
-                confidence = suspicious.get("confidence", 0.8)
+            sha256_hash = await sha256_upload(apk)
+        cache_key = (sha256_hash, package_name)
+        verdict = app_verdict_cache.get(cache_key)
+        if verdict is None:
+            verdict = await _lookup_app_verdict(package_name, sha256_hash)
+            app_verdict_cache.set(cache_key, verdict)
+        status_label = verdict["status"]
         latency_ms = int((time.time() - start) * 1000)
-        data = {
-            "status": status_label,
-            "publisher": publisher,
-            "google_play_link": google_play_link,
-            "confidence": confidence,
-            "latency_ms": latency_ms,
-        }
+        data = {**verdict, "latency_ms": latency_ms}
         logger.info("app verify package=%s status=%s", package_name, status_label)
         return api_success(data)
     except Exception as e:
         logger.exception("app verify error")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/app/registry")
-def app_registry(claims: Dict[str, Any] = Depends(auth_dependency)):
-    items = fetchall("SELECT id, package_name, sha256_hash, publisher, google_play_link, last_verified FROM official_apps ORDER BY id DESC LIMIT 100")
+APP_VERIFY_BATCH_MAX = int(os.getenv("APP_VERIFY_BATCH_MAX", "1000"))
+_OFFICIAL_BY_PACKAGES_OR_HASHES = f"""
+SELECT {OFFICIAL_COLUMNS} FROM official_apps WHERE package_name = ANY(%s)
+UNION
+SELECT {OFFICIAL_COLUMNS} FROM official_apps WHERE sha256_hash = ANY(%s)
+"""
+_SUSPICIOUS_BY_PACKAGES = f"SELECT {SUSPICIOUS_COLUMNS} FROM suspicious_apps WHERE package_name = ANY(%s)"
+
+@app.post("/api/app/verify/batch")
+async def app_verify_batch(dto: AppVerifyBatchDto, claims: Dict[str, Any] = Depends(auth_dependency)):
+    start = time.time()
+    if len(dto.items) > APP_VERIFY_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {APP_VERIFY_BATCH_MAX} items per batch")
+    try:
+        items = [(it.package_name, it.sha256_hash) for it in dto.items]
+        if registry.ready:
+            verdicts = registry.lookup_many(items)
+        else:
+            packages = sorted({p for p, _ in items if p})
+            hashes = sorted({h for _, h in items if h})
+            official = await adb.fetchall(_OFFICIAL_BY_PACKAGES_OR_HASHES, [packages, hashes])
+            suspicious = await adb.fetchall(_SUSPICIOUS_BY_PACKAGES, [packages])
+            verdicts = resolve_from_rows(items, official, suspicious)
+        results = [
+            {"package_name": pkg, "sha256_hash": sha, **verdict}
+            for (pkg, sha), verdict in zip(items, verdicts)
+        ]
+        latency_ms = int((time.time() - start) * 1000)
+        logger.info("app verify batch items=%s", len(results))
+        return api_success({"results": results, "latency_ms": latency_ms})
+    except Exception as e:
+        logger.exception("app verify batch error")
+        raise HTTPException(status_code=500, detail=str(e))
+
+APP_REGISTRY_PAGE_DEFAULT = int(os.getenv("APP_REGISTRY_PAGE_DEFAULT", "100"))
+APP_REGISTRY_PAGE_MAX = int(os.getenv("APP_REGISTRY_PAGE_MAX", "1000"))
+
+def _weak_etag(key: str) -> str:
+    return 'W/"%s"' % hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+def _registry_page_statement(table: str, columns: str, with_cursor: bool, with_publisher: bool) -> Statement:
+    """One prepared statement per (table, filter combination); params are cursor, publisher, limit in that order."""
+    where = []
+    if with_cursor:
+        where.append("id < %s")
+    if with_publisher:
+        where.append("publisher = %s")
+    sql = f"SELECT {columns} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC LIMIT %s"
+    name = f"registry_page_{table}" + ("_cursor" if with_cursor else "") + ("_publisher" if with_publisher else "")
+    return statement(name, sql)
+
+def _registry_page(table: str, columns: str, request: Request, response: Response, cursor: Optional[int], limit: int, publisher: Optional[str]):
+    """
+    Keyset page of `table` ordered by id DESC: rows with id < cursor.
+    While the registry index is in sync the ETag is derived from its fingerprint, so a matching
+    If-None-Match is answered with 304 before any query runs. Otherwise the ETag is a hash of the
+    rows actually returned, which never vouches for data the index has not seen.
+    """
+    if_none_match = request.headers.get("if-none-match", "")
+    etag = None
+    fingerprint = registry.fingerprint(table)
+    if fingerprint is not None:
+        etag = _weak_etag(f"{table}|{fingerprint}|{cursor}|{limit}|{publisher}")
+        if _etag_matches(etag, if_none_match):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    params: List[Any] = []
+    if cursor is not None:
+        params.append(cursor)
+    if publisher:
+        params.append(publisher)
+    params.append(limit + 1)
+    items = fetchall(_registry_page_statement(table, columns, cursor is not None, bool(publisher)), params)
+
+    if etag is None:
+        etag = _weak_etag(f"{table}|{cursor}|{limit}|{publisher}|" + json.dumps(items, default=str, sort_keys=True))
+        if _etag_matches(etag, if_none_match):
+            return Response(status_code=304, headers={"ETag": etag})
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1]["id"]
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["ETag"] = etag
     return api_success(items)
 
+@app.get("/api/app/registry")
+def app_registry(
+    request: Request,
+    response: Response,
+    cursor: Optional[int] = None,
+    limit: int = Query(APP_REGISTRY_PAGE_DEFAULT, ge=1, le=APP_REGISTRY_PAGE_MAX),
+    publisher: Optional[str] = None,
+    claims: Dict[str, Any] = Depends(auth_dependency),
+):
+    return _registry_page("official_apps", OFFICIAL_COLUMNS, request, response, cursor, limit, publisher)
+
 @app.get("/api/app/suspicious")
-def app_suspicious(claims: Dict[str, Any] = Depends(auth_dependency)):
-    items = fetchall("SELECT id, package_name, publisher, google_play_link, confidence FROM suspicious_apps ORDER BY id DESC LIMIT 100")
-    return api_success(items)
+def app_suspicious(
+    request: Request,
+    response: Response,
+    cursor: Optional[int] = None,
+    limit: int = Query(APP_REGISTRY_PAGE_DEFAULT, ge=1, le=APP_REGISTRY_PAGE_MAX),
+    publisher: Optional[str] = None,
+    claims: Dict[str, Any] = Depends(auth_dependency),
+):
+    return _registry_page("suspicious_apps", SUSPICIOUS_COLUMNS, request, response, cursor, limit, publisher)
 
 @app.post("/api/app/registry")
 def app_add_official(body: Dict[str, Any], claims: Dict[str, Any] = Depends(auth_dependency)):
@@ -278,43 +543,52 @@ def app_add_official(body: Dict[str, Any], claims: Dict[str, Any] = Depends(auth
         """,
         [body.get("package_name"), body.get("sha256_hash"), body.get("publisher"), body.get("google_play_link")],
     )
+    # The registry listener picks the row up from the trigger's NOTIFY
     return api_success({"id": row["id"]})
 
+@app.post("/api/app/registry/import")
+def app_registry_import(
+    file: UploadFile = File(...),
+    target: str = Form("official"),
+    format: Optional[str] = Form(None),
+    claims: Dict[str, Any] = Depends(auth_dependency),
+):
+    try:
+        result = import_registry(file.file, target, format or detect_format(file.filename))
+    except RegistryImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("registry import error")
+        raise HTTPException(status_code=500, detail=str(e))
+    logger.info(
+        "registry import target=%s received=%s inserted=%s updated=%s rejected=%s",
+        target, result["received"], result["inserted"], result["updated"], result["rejected"],
+    )
+    return api_success(result)
+
 # ----- Grievance -----
-CATEGORIES = [
-    "unauthorized_debit",
-    "loan_dispute",
-    "account_closure",
-    "failed_transfer",
-    "card_fraud",
-    "digital_service_issue",
-    "other",
-]
+_GRIEVANCE_INSERT = statement(
+    "grievance_insert",
+    """
+    INSERT INTO grievances(complaint_id, user_id, text, category, urgency, status, created_at, updated_at)
+    VALUES(%s,%s,%s,%s,%s,%s,NOW(),NOW())
+    RETURNING complaint_id, category, urgency, status, created_at
+    """,
+)
 
 @app.post("/api/grievance/file")
 def file_grievance(dto: FileGrievanceDto, claims: Dict[str, Any] = Depends(auth_dependency)):
     start = time.time()
-    category = dto.category
-    if not category:
-        try:
-            resp = requests.post(f"{GRIEVANCE_SERVICE_URL}/categorize", json={"text": dto.text}, timeout=5)
-            if resp.status_code == 200:
-                j = resp.json()
-                category = j.get("category", "other")
-            else:
-                category = "other"
-        except Exception:
-            category = "other"
-    urgency = "HIGH" if (category in ["card_fraud", "unauthorized_debit"] or ("fraud" in dto.text.lower() or "debit" in dto.text.lower())) else "MEDIUM"
-    complaint_id = f"CASE#{int(time.time()*1000)}"
+    # Categorization happens off the request path (grievance_worker); intake is a single INSERT
+    category = dto.category if dto.category in CATEGORIES else PENDING
+    urgency = urgency_for(category, dto.text)
+    complaint_id = f"CASE#{ids.encode(ids.next_id())}"
     row = fetchone(
-        """
-        INSERT INTO grievances(complaint_id, user_id, text, category, urgency, status, created_at, updated_at)
-        VALUES(%s,%s,%s,%s,%s,%s,NOW(),NOW())
-        RETURNING complaint_id, category, urgency, status, created_at
-        """,
-        [complaint_id, int(claims["sub"]), dto.text, category if category in CATEGORIES else "other", urgency, "RECEIVED"],
+        _GRIEVANCE_INSERT,
+        [complaint_id, int(claims["sub"]), dto.text, category, urgency, "RECEIVED"],
     )
+    if category == PENDING:
+        grievance_workers.wake()
     latency_ms = int((time.time() - start) * 1000)
     return api_success({
         "complaint_id": row["complaint_id"],
@@ -325,9 +599,14 @@ def file_grievance(dto: FileGrievanceDto, claims: Dict[str, Any] = Depends(auth_
         "latency_ms": latency_ms,
     })
 
+_GRIEVANCE_STATUS = statement(
+    "grievance_status",
+    "SELECT complaint_id, category, urgency, status, created_at, updated_at FROM grievances WHERE complaint_id=%s AND user_id=%s",
+)
+
 @app.get("/api/grievance/status/{complaint_id}")
 def grievance_status(complaint_id: str, claims: Dict[str, Any] = Depends(auth_dependency)):
-    doc = fetchone("SELECT complaint_id, category, urgency, status, created_at, updated_at FROM grievances WHERE complaint_id=%s AND user_id=%s", [complaint_id, int(claims["sub"])])
+    doc = fetchone(_GRIEVANCE_STATUS, [complaint_id, int(claims["sub"])])
     if not doc:
         raise HTTPException(status_code=404, detail="Complaint not found")
     last_update = doc.get("updated_at") or doc.get("created_at") or datetime.now(timezone.utc)
@@ -351,30 +630,68 @@ def grievance_status(complaint_id: str, claims: Dict[str, Any] = Depends(auth_de
 @app.post("/api/grievance/categorize")
 def grievance_categorize(dto: CategorizeDto, claims: Dict[str, Any] = Depends(auth_dependency)):
     try:
-        resp = requests.post(f"{GRIEVANCE_SERVICE_URL}/categorize", json={"text": dto.text}, timeout=5)
-        if resp.status_code == 200:
-            j = resp.json()
-            return api_success(j)
-        return api_success({"category": "other", "confidence": 0.5})
+        return api_success(categorizer.categorize(dto.text))
     except Exception as e:
         logger.warning("grievance categorize fallback: %s", str(e))
         return api_success({"category": "other", "confidence": 0.5})
 
-@app.get("/api/grievance/analytics")
-def grievance_analytics(claims: Dict[str, Any] = Depends(auth_dependency)):
-    total = fetchone("SELECT COUNT(*) AS c FROM grievances")
-    rows = fetchall("SELECT category, COUNT(*) AS c FROM grievances GROUP BY category")
-    cat_counts = {r["category"]: r["c"] for r in rows}
-    times = fetchall("SELECT EXTRACT(EPOCH FROM (updated_at - created_at))/3600.0 AS hrs FROM grievances WHERE updated_at IS NOT NULL AND created_at IS NOT NULL")
-    vals = [t["hrs"] for t in times]
-    avg_resolution = sum(vals)/len(vals) if vals else 0.0
-    high_pending = fetchone("SELECT COUNT(*) AS c FROM grievances WHERE urgency='HIGH' AND status <> 'RESOLVED'")
-    return api_success({
-        "total_complaints": total["c"] if total else 0,
+CATEGORIZE_BATCH_API_MAX = int(os.getenv("CATEGORIZE_BATCH_API_MAX", "1000"))
+
+@app.post("/api/grievance/categorize/batch")
+def grievance_categorize_batch(dto: CategorizeBatchDto, claims: Dict[str, Any] = Depends(auth_dependency)):
+    if len(dto.texts) > CATEGORIZE_BATCH_API_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {CATEGORIZE_BATCH_API_MAX} texts per batch")
+    try:
+        results = categorizer.categorize_many(dto.texts)
+    except Exception as e:
+        logger.warning("grievance categorize batch fallback: %s", str(e))
+        results = [{"category": "other", "confidence": 0.5} for _ in dto.texts]
+    return api_success({"results": results})
+
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "10"))
+ANALYTICS_CACHE_STALE_TTL = float(os.getenv("ANALYTICS_CACHE_STALE_TTL", "60"))
+# Dashboards poll these; at most one query set per key per TTL regardless of viewer count
+analytics_cache = SWRCache("grievance_analytics", ttl=ANALYTICS_CACHE_TTL, stale_ttl=ANALYTICS_CACHE_STALE_TTL)
+
+_ROLLUPS = statement("grievance_rollups", "SELECT category, total, high_pending, resolution_hours_sum, resolution_count FROM grievance_rollups")
+
+def _compute_grievance_analytics() -> Dict[str, Any]:
+    # O(categories): grievance_rollups is kept current by a trigger on grievances. It only covers
+    # categorized rows; grievances still queued for categorization add to the total alone
+    rows = fetchall(_ROLLUPS)
+    queued = fetchone(_PENDING_COUNT)["n"]
+    total = sum(r["total"] for r in rows) + queued
+    cat_counts = {r["category"]: r["total"] for r in rows if r["total"]}
+    hours_sum = sum(float(r["resolution_hours_sum"]) for r in rows)
+    hours_count = sum(r["resolution_count"] for r in rows)
+    avg_resolution = hours_sum / hours_count if hours_count else 0.0
+    high_pending = sum(r["high_pending"] for r in rows)
+    return {
+        "total_complaints": total,
         "by_category": cat_counts,
         "avg_resolution_time_hours": round(avg_resolution, 2),
-        "high_priority_pending": high_pending["c"] if high_pending else 0,
-    })
+        "high_priority_pending": high_pending,
+    }
+
+@app.get("/api/grievance/analytics")
+def grievance_analytics(claims: Dict[str, Any] = Depends(auth_dependency)):
+    return api_success(analytics_cache.get_or_compute("snapshot", _compute_grievance_analytics))
+
+@app.get("/api/grievance/analytics/timeseries")
+def grievance_analytics_timeseries(
+    bucket: str = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    claims: Dict[str, Any] = Depends(auth_dependency),
+):
+    try:
+        data = analytics_cache.get_or_compute(
+            ("timeseries", bucket, start, end),
+            lambda: analytics.timeseries(bucket, start, end),
+        )
+        return api_success(data)
+    except analytics.AnalyticsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Existing test endpoint
 @app.get("/test")
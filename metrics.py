@@ -0,0 +1,173 @@
+"""
+Prometheus metrics, served at /metrics.
+- HTTP latency, request and error counts by route template, plus requests in flight (MetricsMiddleware)
+- DB query latency by statement name, from database.py / async_database.py query hooks
+  (unprepared queries are labeled by verb and table, e.g. select_users)
+- ML call latency and outcome per service, from ml_client call hooks
+- Sync/async connection pool usage and ML circuit state, read at scrape time
+- With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty directory so histograms and
+  counters are summed across workers; pool gauges then describe the worker that served the scrape
+"""
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+
+import async_database as adb
+import database
+import ml_client
+from circuit_breaker import OPEN
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ML_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_DURATION = Histogram(
+    "trustguard_http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+)
+HTTP_REQUESTS = Counter(
+    "trustguard_http_requests", "HTTP requests by response status", ["method", "route", "status"],
+)
+HTTP_ERRORS = Counter(
+    "trustguard_http_request_errors", "HTTP requests answered with 5xx or an unhandled exception", ["method", "route"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "trustguard_http_requests_in_flight", "HTTP requests being handled", multiprocess_mode="livesum",
+)
+DB_DURATION = Histogram(
+    "trustguard_db_query_duration_seconds", "Database query latency", ["pool", "statement"], buckets=DB_BUCKETS,
+)
+DB_ERRORS = Counter(
+    "trustguard_db_query_errors", "Database queries that raised", ["pool", "statement"],
+)
+ML_DURATION = Histogram(
+    "trustguard_ml_call_duration_seconds", "ML service call latency including retries", ["service", "path", "outcome"],
+    buckets=ML_BUCKETS,
+)
+
+_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def query_label(sql: str) -> str:
+    words = sql.split(None, 1)
+    verb = words[0].lower() if words else "empty"
+    table = _TABLE.search(sql)
+    return f"{verb}_{table.group(1).lower()}" if table else verb
+
+
+def _query_hook(pool: str):
+    def hook(name: Optional[str], sql: str, seconds: float, failed: bool) -> None:
+        label = name or query_label(sql)
+        DB_DURATION.labels(pool, label).observe(seconds)
+        if failed:
+            DB_ERRORS.labels(pool, label).inc()
+    return hook
+
+
+def _ml_hook(service: str, path: str, seconds: float, outcome: str) -> None:
+    ML_DURATION.labels(service, path, outcome).observe(seconds)
+
+
+database.add_query_hook(_query_hook("sync"))
+adb.add_query_hook(_query_hook("async"))
+ml_client.add_call_hook(_ml_hook)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request; labels by route template, not the raw path."""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            method = scope["method"] if scope["method"] in _METHODS else "other"
+            route = self._route(scope)
+            HTTP_DURATION.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            if status >= 500:
+                HTTP_ERRORS.labels(method, route).inc()
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is not None:
+            path = self._routes.get(endpoint)
+            if path is not None:
+                return path
+        routes = getattr(scope.get("app"), "routes", [])
+        if endpoint is not None:
+            for route in routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    self._routes[endpoint] = route.path
+                    return route.path
+        # Answered before routing (e.g. the upload size check) or no route matched
+        for route in routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return "unmatched"
+
+
+class _StateCollector:
+    """Pool and circuit-breaker state, read when /metrics is scraped."""
+
+    def collect(self):
+        connections = GaugeMetricFamily("trustguard_db_pool_connections", "Pooled connections by state", labels=["pool", "state"])
+        waiting = GaugeMetricFamily("trustguard_db_pool_waiting", "Callers waiting for a pooled connection", labels=["pool"])
+        maximum = GaugeMetricFamily("trustguard_db_pool_max", "Pool size limit", labels=["pool"])
+        timeouts = CounterMetricFamily("trustguard_db_pool_timeouts", "Checkouts that timed out", labels=["pool"])
+        for pool, stats_fn in (("sync", database.pool_stats), ("async", adb.pool_stats)):
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            connections.add_metric([pool, "in_use"], stats["in_use"])
+            connections.add_metric([pool, "idle"], stats["idle"])
+            waiting.add_metric([pool], stats["waiting"])
+            maximum.add_metric([pool], stats["max"])
+            timeouts.add_metric([pool], stats["timeouts"])
+        circuit = GaugeMetricFamily("trustguard_ml_circuit_open", "1 while the service's circuit breaker is open", labels=["service"])
+        for name, client in ml_client.CLIENTS.items():
+            circuit.add_metric([name], 1 if client.breaker.state == OPEN else 0)
+        return [connections, waiting, maximum, timeouts, circuit]
+
+
+_state_collector = _StateCollector()
+REGISTRY.register(_state_collector)
+
+
+def render() -> Tuple[bytes, str]:
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_state_collector)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,326 @@
+"""
+Shared HTTP client for the identity and grievance ML services.
+- Keep-alive connection pooling (one httpx client per service, sync and async)
+- Per-service timeouts and concurrency limits
+- Retry with exponential backoff and full jitter on connection errors / 5xx gateway responses
+- Per-service circuit breaker with background /health probing, so outages fail fast
+- Call hooks (add_call_hook) observe the duration and outcome of every call
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from circuit_breaker import CircuitBreaker, OPEN
+
+load_dotenv()
+
+IDENTITY_SERVICE_URL = os.getenv("IDENTITY_SERVICE_URL", "http://localhost:5001")
+GRIEVANCE_SERVICE_URL = os.getenv("GRIEVANCE_SERVICE_URL", "http://localhost:5002")
+
+ML_RETRY_BACKOFF = float(os.getenv("ML_RETRY_BACKOFF", "0.1"))
+ML_KEEPALIVE_EXPIRY = float(os.getenv("ML_KEEPALIVE_EXPIRY", "30"))
+ML_BREAKER_FAILURE_RATE = float(os.getenv("ML_BREAKER_FAILURE_RATE", "0.5"))
+ML_BREAKER_WINDOW = int(os.getenv("ML_BREAKER_WINDOW", "20"))
+ML_BREAKER_MIN_CALLS = int(os.getenv("ML_BREAKER_MIN_CALLS", "5"))
+ML_BREAKER_OPEN_SECONDS = float(os.getenv("ML_BREAKER_OPEN_SECONDS", "30"))
+ML_HEALTH_PROBE_INTERVAL = float(os.getenv("ML_HEALTH_PROBE_INTERVAL", "5"))
+
+# Responses that mean "the service (or its proxy) is not there right now", safe to retry
+RETRY_STATUSES = {502, 503, 504}
+
+
+class MLServiceError(Exception):
+    """Raised when an ML service call fails after retries or returns a non-200 status."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(MLServiceError):
+    """Raised without touching the network while a service's breaker is open."""
+
+
+class ConcurrencyLimitError(MLServiceError):
+    """Raised when no call slot for the service frees up within its read timeout."""
+
+
+# Called as hook(service, path, seconds, outcome) after each call; must not raise
+CallHook = Callable[[str, str, float, str], None]
+_call_hooks: List[CallHook] = []
+
+
+def add_call_hook(hook: CallHook) -> None:
+    _call_hooks.append(hook)
+
+
+def call_outcome(exc: Optional[BaseException]) -> str:
+    """Low-cardinality label for how a call ended."""
+    if exc is None:
+        return "ok"
+    if isinstance(exc, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, ConcurrencyLimitError):
+        return "concurrency_limit"
+    if isinstance(exc, MLServiceError) and exc.status_code is not None:
+        return f"http_{exc.status_code}"
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.TransportError):
+        return "connection_error"
+    return "error"
+
+
+# Failures where the request never reached the model, so sending it again is safe
+_RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class MLClient:
+    def __init__(self, name: str, base_url: str, timeout: float, connect_timeout: float = 2.0, max_concurrency: int = 32, retries: int = 1):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self._limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency,
+            keepalive_expiry=ML_KEEPALIVE_EXPIRY,
+        )
+        self._client: Optional[httpx.Client] = None
+        self._aclient: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self.breaker = CircuitBreaker(
+            name,
+            failure_rate=ML_BREAKER_FAILURE_RATE,
+            window=ML_BREAKER_WINDOW,
+            min_calls=ML_BREAKER_MIN_CALLS,
+            open_seconds=ML_BREAKER_OPEN_SECONDS,
+        )
+
+    # ----- client lifecycle -----
+    def _sync_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self._limits)
+        return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self._limits)
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._aclient
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+            self._async_slots = None
+
+    # ----- helpers -----
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, ML_RETRY_BACKOFF * (2 ** attempt))
+
+    def _parse(self, resp: httpx.Response) -> Dict[str, Any]:
+        if resp.status_code != 200:
+            raise MLServiceError(f"{self.name} ML service error {resp.status_code}", resp.status_code)
+        return resp.json()
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} ML service circuit open", 503)
+
+    def _record(self, exc: Optional[BaseException]) -> None:
+        if exc is None:
+            self.breaker.record_success()
+        elif isinstance(exc, MLServiceError) and exc.status_code is not None and exc.status_code < 500:
+            # The service answered; a client-side error says nothing about its health
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(f"{type(exc).__name__}: {exc}")
+
+    def _observe(self, path: str, start: float, exc: Optional[BaseException]) -> None:
+        elapsed = time.perf_counter() - start
+        outcome = call_outcome(exc)
+        for hook in _call_hooks:
+            hook(self.name, path, elapsed, outcome)
+
+    # ----- sync interface (threadpool routes) -----
+    def post_json(self, path: str, **kwargs) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            data = self._post_json(path, **kwargs)
+        except BaseException as e:
+            self._observe(path, start, e)
+            raise
+        self._observe(path, start, None)
+        return data
+
+    def _post_json(self, path: str, **kwargs) -> Dict[str, Any]:
+        self._admit()
+        settled = False
+        try:
+            if not self._sync_slots.acquire(timeout=self.timeout.read):
+                raise ConcurrencyLimitError(f"{self.name} ML service concurrency limit reached")
+            try:
+                client = self._sync_client()
+                for attempt in range(self.retries + 1):
+                    try:
+                        resp = client.post(path, **kwargs)
+                    except _RETRYABLE_ERRORS as e:
+                        if attempt >= self.retries:
+                            settled = True
+                            self._record(e)
+                            raise
+                    except httpx.HTTPError as e:
+                        settled = True
+                        self._record(e)
+                        raise
+                    else:
+                        if resp.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                            settled = True
+                            return self._finish(resp)
+                    time.sleep(self._backoff(attempt))
+            finally:
+                self._sync_slots.release()
+        finally:
+            if not settled:
+                # No slot, a local failure or cancellation: the service was never judged, so give
+                # back a half-open trial slot instead of leaking it
+                self.breaker.release()
+
+    # ----- async interface (async routes) -----
+    async def apost_json(self, path: str, body_factory: Optional[Callable[[], Any]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        POST and decode JSON. `body_factory`, if given, is called once per attempt to produce
+        a fresh streamed request body, so streamed uploads can be retried.
+        """
+        start = time.perf_counter()
+        try:
+            data = await self._apost_json(path, body_factory, **kwargs)
+        except BaseException as e:
+            self._observe(path, start, e)
+            raise
+        self._observe(path, start, None)
+        return data
+
+    async def _apost_json(self, path: str, body_factory: Optional[Callable[[], Any]], **kwargs) -> Dict[str, Any]:
+        self._admit()
+        settled = False
+        try:
+            client = self._async_client()
+            slots = self._async_slots
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout=self.timeout.read)
+            except asyncio.TimeoutError:
+                raise ConcurrencyLimitError(f"{self.name} ML service concurrency limit reached")
+            try:
+                for attempt in range(self.retries + 1):
+                    try:
+                        resp = await client.post(path, content=body_factory() if body_factory else None, **kwargs)
+                    except _RETRYABLE_ERRORS as e:
+                        if attempt >= self.retries:
+                            settled = True
+                            self._record(e)
+                            raise
+                    except httpx.HTTPError as e:
+                        settled = True
+                        self._record(e)
+                        raise
+                    else:
+                        if resp.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                            settled = True
+                            return self._finish(resp)
+                    await asyncio.sleep(self._backoff(attempt))
+            finally:
+                slots.release()
+        finally:
+            if not settled:
+                # See _post_json: covers CancelledError from client disconnects and wait_for timeouts
+                self.breaker.release()
+
+    def _finish(self, resp: httpx.Response) -> Dict[str, Any]:
+        try:
+            data = self._parse(resp)
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return data
+
+    def health(self) -> Dict[str, Any]:
+        """GET /health and return its `data` payload; read-only, the breaker is left alone."""
+        resp = self._sync_client().get("/health", timeout=self.timeout.connect)
+        return self._parse(resp).get("data") or {}
+
+    async def probe(self) -> bool:
+        """GET /health on the service and feed the result to the breaker."""
+        client = self._async_client()
+        try:
+            resp = await client.get("/health", timeout=self.timeout.connect)
+            healthy = resp.status_code == 200
+            self.breaker.record_probe(healthy, f"status {resp.status_code}")
+        except httpx.HTTPError as e:
+            healthy = False
+            self.breaker.record_probe(False, f"{type(e).__name__}: {e}")
+        return healthy
+
+
+identity_client = MLClient(
+    "identity",
+    IDENTITY_SERVICE_URL,
+    timeout=float(os.getenv("IDENTITY_ML_TIMEOUT", "30")),
+    connect_timeout=float(os.getenv("IDENTITY_ML_CONNECT_TIMEOUT", "2")),
+    max_concurrency=int(os.getenv("IDENTITY_ML_MAX_CONCURRENCY", "16")),
+    retries=int(os.getenv("IDENTITY_ML_RETRIES", "1")),
+)
+
+grievance_client = MLClient(
+    "grievance",
+    GRIEVANCE_SERVICE_URL,
+    timeout=float(os.getenv("GRIEVANCE_ML_TIMEOUT", "5")),
+    connect_timeout=float(os.getenv("GRIEVANCE_ML_CONNECT_TIMEOUT", "1")),
+    max_concurrency=int(os.getenv("GRIEVANCE_ML_MAX_CONCURRENCY", "32")),
+    retries=int(os.getenv("GRIEVANCE_ML_RETRIES", "2")),
+)
+
+CLIENTS = {c.name: c for c in (identity_client, grievance_client)}
+
+
+def close_all() -> None:
+    for c in CLIENTS.values():
+        c.close()
+
+
+async def aclose_all() -> None:
+    for c in CLIENTS.values():
+        await c.aclose()
+
+
+def breaker_states() -> Dict[str, Any]:
+    return {name: c.breaker.snapshot() for name, c in CLIENTS.items()}
+
+
+async def probe_loop() -> None:
+    """Background task: probe services whose breaker is open so they recover without user traffic."""
+    while True:
+        await asyncio.sleep(ML_HEALTH_PROBE_INTERVAL)
+        for c in CLIENTS.values():
+            if c.breaker.state == OPEN:
+                await c.probe()
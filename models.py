@@ -1,7 +1,7 @@
 from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, UniqueConstraint
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Float, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from database import Base
 
@@ -19,7 +19,7 @@ class User(Base):
 
 class IdentityCheck(Base):
     __tablename__ = "identity_checks"
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
     deepfake_score: Mapped[float] = mapped_column(Float, default=0.0)
     liveness_status: Mapped[str] = mapped_column(String(32), default="PASS")
@@ -60,5 +60,7 @@ class Grievance(Base):
     status: Mapped[str] = mapped_column(String(32), default="RECEIVED")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    claimed_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    categorize_attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
     user = relationship("User", back_populates="grievances")
@@ -0,0 +1,142 @@
+"""
+bcrypt hashing off the request path.
+- Runs hashpw/checkpw in a dedicated, fixed-size process pool so credential bursts cannot starve other endpoints
+- Admission is bounded: beyond PASSWORD_QUEUE_MAX queued+running jobs callers get PasswordPoolBusy (503)
+- Logins have their own concurrency limit (LOGIN_MAX_CONCURRENCY) inside that bound
+- Hashes made with a different cost than BCRYPT_ROUNDS are reported by needs_rehash()
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Queued + running hash jobs across register and login
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "64"))
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", "32"))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+def _hash(password: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def _noop() -> None:
+    return None
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    # $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed: str) -> bool:
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_max: int, login_max: int):
+        self.workers = workers
+        self.queue_max = queue_max
+        self.login_max = login_max
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(queue_max)
+        self._login_slots = threading.BoundedSemaphore(login_max)
+        self._in_flight = 0
+        self._logins_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: children must not inherit the API's threads, sockets and DB connections
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def start(self) -> None:
+        """Spawn the worker processes up front so the first logins don't pay for interpreter start-up."""
+        pool = self._pool()
+        for _ in range(self.workers):
+            pool.submit(_noop)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args, login: bool = False):
+        if login and not self._login_slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy("too many concurrent logins")
+        if not self._slots.acquire(blocking=False):
+            if login:
+                self._login_slots.release()
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy("password hashing queue is full")
+        with self._lock:
+            self._in_flight += 1
+            if login:
+                self._logins_in_flight += 1
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._done(login)
+            raise
+        # Slots follow the job, not the caller: a cancelled request must not free a slot bcrypt still occupies
+        future.add_done_callback(lambda _: self._done(login))
+        return await asyncio.wrap_future(future)
+
+    def _done(self, login: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+            if login:
+                self._logins_in_flight -= 1
+        self._slots.release()
+        if login:
+            self._login_slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password.encode("utf-8"), BCRYPT_ROUNDS)
+
+    async def check(self, password: str, hashed: str) -> bool:
+        return await self._run(_check, password.encode("utf-8"), hashed.encode("utf-8"), login=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": BCRYPT_ROUNDS,
+                "queue_max": self.queue_max,
+                "login_max": self.login_max,
+                "in_flight": self._in_flight,
+                "logins_in_flight": self._logins_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+hasher = PasswordHasher(PASSWORD_POOL_WORKERS, PASSWORD_QUEUE_MAX, LOGIN_MAX_CONCURRENCY)
@@ -0,0 +1,140 @@
+"""
+Stress test for ids.py: generates IDs concurrently from many processes (and threads per process)
+and fails if any ID repeats or a worker's IDs are not strictly increasing.
+
+    python perf/id_stress.py --processes 8 --per-process 2000000
+    python perf/id_stress.py --threads 4 --mode single
+"""
+import argparse
+import heapq
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ids  # noqa: E402
+
+CHUNK = 4096
+
+
+def _generate(args):
+    count, threads, mode, out_dir = args
+    gen = ids.generator()
+    per_thread = count // threads
+    results = [None] * threads
+
+    def run(slot):
+        buf = array("q")
+        if mode == "bulk":
+            remaining = per_thread
+            while remaining:
+                n = min(CHUNK, remaining)
+                buf.extend(gen.next_ids(n))
+                remaining -= n
+        else:
+            next_id = gen.next_id
+            for _ in range(per_thread):
+                buf.append(next_id())
+        results[slot] = buf
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    started = time.time()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    finished = time.time()
+
+    failures = []
+    for buf in results:
+        if any(buf[i] >= buf[i + 1] for i in range(len(buf) - 1)):
+            failures.append("ids from one thread are not strictly increasing")
+    merged = array("q", sorted(x for buf in results for x in buf))
+    path = os.path.join(out_dir, f"{os.getpid()}.bin")
+    with open(path, "wb") as f:
+        merged.tofile(f)
+    return {
+        "pid": os.getpid(),
+        "worker_id": gen.worker_id,
+        "count": len(merged),
+        "started": started,
+        "finished": finished,
+        "clock_rollbacks": gen.clock_rollbacks,
+        "path": path,
+        "failures": failures,
+    }
+
+
+def _read(path):
+    buf = array("q")
+    with open(path, "rb") as f:
+        buf.frombytes(f.read())
+    return buf
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Uniqueness/throughput stress test for ids.py")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--threads", type=int, default=1, help="threads per process sharing one generator")
+    parser.add_argument("--per-process", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=["bulk", "single"], default="bulk", help="next_ids(4096) or next_id()")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # One node whose processes claim slots with lock files, as an API replica's workers do
+        os.environ.pop("ID_WORKER_ID", None)
+        os.environ["ID_NODE_ID"] = "0"
+        os.environ["ID_PROCESS_BITS"] = str(max(1, (args.processes - 1).bit_length()))
+        os.environ["ID_LOCK_DIR"] = os.path.join(out_dir, "locks")
+        # Start all processes first so generation overlaps in time
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(args.processes) as pool:
+            wall = time.perf_counter()
+            stats = pool.map(_generate, [(args.per_process, args.threads, args.mode, out_dir)] * args.processes)
+            wall = time.perf_counter() - wall
+
+        failures = [f for s in stats for f in s["failures"]]
+        worker_ids = [s["worker_id"] for s in stats]
+        if len(set(worker_ids)) != len(worker_ids):
+            failures.append(f"worker ids collided: {sorted(worker_ids)}")
+
+        total = 0
+        duplicates = 0
+        previous = None
+        for value in heapq.merge(*(_read(s["path"]) for s in stats)):
+            if value == previous:
+                duplicates += 1
+            previous = value
+            total += 1
+        if duplicates:
+            failures.append(f"{duplicates} duplicate ids")
+
+    per_process = [s["count"] / (s["finished"] - s["started"]) for s in stats]
+    # Generation window across all processes, excluding spawn and verification time
+    window = max(s["finished"] for s in stats) - min(s["started"] for s in stats)
+    report = {
+        "processes": args.processes,
+        "threads": args.threads,
+        "mode": args.mode,
+        "ids": total,
+        "duplicates": duplicates,
+        "clock_rollbacks": sum(s["clock_rollbacks"] for s in stats),
+        "ids_per_sec_per_process_min": round(min(per_process)),
+        "ids_per_sec_aggregate": round(total / window),
+        "generation_seconds": round(window, 3),
+        "wall_seconds": round(wall, 3),
+        "ok": not failures,
+        "failures": failures,
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""
+Load-test suite for the API.
+- Starts a throwaway Postgres (initdb/pg_ctl from --pg-bin or PATH), or a scratch database on --dsn
+- Replaces identity-ml and grievance-ml with perf/stubs.py at configurable latency
+- Runs the app under uvicorn, seeds data, then drives each scenario at fixed concurrency levels
+- Scenario parameters, upload payloads and seeded rows derive from --seed, so reruns send the same workload
+- Writes throughput and p50/p95/p99 per scenario and concurrency as JSON; `compare` diffs two runs
+
+    python perf/loadtest.py run --concurrency 1,8,32 --duration 10 --out perf/results/HEAD.json
+    python perf/loadtest.py run --dsn postgresql://postgres@localhost:5432/postgres --scenarios login,grievance_file
+    python perf/loadtest.py compare perf/results/base.json perf/results/HEAD.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import httpx
+import psycopg2
+import psycopg2.extensions
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(PERF_DIR)
+sys.path.insert(0, PERF_DIR)
+
+from plan_check import SEED  # noqa: E402
+
+SCRATCH_DB = "trustguard_loadtest"
+PERCENTILES = (50, 95, 99)
+
+
+# ----- environment -----
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url: str, timeout: float, proc=None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+@contextmanager
+def local_postgres(pg_bin):
+    """initdb + pg_ctl in a temporary directory; yields a DSN for the `postgres` superuser."""
+    initdb = os.path.join(pg_bin, "initdb") if pg_bin else shutil.which("initdb")
+    pg_ctl = os.path.join(pg_bin, "pg_ctl") if pg_bin else shutil.which("pg_ctl")
+    if not initdb or not pg_ctl:
+        raise RuntimeError("initdb/pg_ctl not found; pass --pg-bin or use --dsn")
+    tmp = tempfile.mkdtemp(prefix="trustguard-pg-")
+    data = os.path.join(tmp, "data")
+    port = _free_port()
+    try:
+        subprocess.run([initdb, "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-locale"],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([pg_ctl, "-D", data, "-w", "-l", os.path.join(tmp, "log"),
+                        "-o", f"-p {port} -k {tmp} -c listen_addresses='' -c fsync=off", "start"],
+                       check=True, stdout=subprocess.DEVNULL)
+        try:
+            yield f"host={tmp} port={port} user=postgres dbname=postgres"
+        finally:
+            subprocess.run([pg_ctl, "-D", data, "-m", "fast", "-w", "stop"], stdout=subprocess.DEVNULL)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@contextmanager
+def scratch_database(dsn: str):
+    admin = psycopg2.connect(dsn.replace("+psycopg2", ""))
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"DROP DATABASE IF EXISTS {SCRATCH_DB} WITH (FORCE)")
+        cur.execute(f"CREATE DATABASE {SCRATCH_DB} ENCODING 'UTF8' TEMPLATE template0")
+    try:
+        yield psycopg2.extensions.make_dsn(dsn.replace("+psycopg2", ""), dbname=SCRATCH_DB)
+    finally:
+        with admin.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {SCRATCH_DB} WITH (FORCE)")
+        admin.close()
+
+
+@contextmanager
+def process(args, log_path, env=None, health=None, timeout=60.0):
+    with open(log_path, "wb") as log:
+        proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            if health:
+                try:
+                    _wait_http(health, timeout, proc)
+                except RuntimeError:
+                    with open(log_path, "rb") as f:
+                        sys.stderr.write(f.read()[-4000:].decode("utf-8", "replace"))
+                    raise
+            yield proc
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def _dsn_url(dsn: str) -> str:
+    """libpq key=value DSN -> postgresql:// URL (async_database hands DATABASE_URL to psycopg 3 as-is)."""
+    params = psycopg2.extensions.parse_dsn(dsn)
+    host = params.get("host", "localhost")
+    query = f"?host={quote(host, safe='')}" if host.startswith("/") else ""
+    userinfo = quote(params.get("user", "postgres"), safe="")
+    if params.get("password"):
+        userinfo += ":" + quote(params["password"], safe="")
+    netloc = f"{userinfo}@{'' if query else host}:{params.get('port', 5432)}"
+    return f"postgresql://{netloc}/{quote(params['dbname'], safe='')}{query}"
+
+
+def seed(dsn: str, grievances: int, apps: int, rng_seed: int) -> None:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        # The seed SQL calls random(); fix its sequence too
+        cur.execute("SELECT setseed(%s)", [random.Random(rng_seed).uniform(-1.0, 1.0)])
+        cur.execute(SEED, {"users": 1000, "checks": grievances // 2, "apps": apps, "grievances": grievances})
+        cur.execute("ANALYZE")
+        # The seed suppresses per-row registry notifications; tell the API to reload once
+        cur.execute("SELECT pg_notify('app_registry', json_build_object('op', 'RELOAD')::text)")
+    conn.close()
+
+
+# ----- scenarios -----
+
+class Context:
+    def __init__(self, run_id: str, seed: int):
+        self.run_id = run_id
+        self.seed = seed
+        self.users = []        # (email, password, token)
+        self.complaints = []   # (complaint_id, token)
+        self.counter = itertools.count()
+        payloads = random.Random(seed)
+        self.video = payloads.randbytes(64 * 1024)
+        self.apk = payloads.randbytes(256 * 1024)
+        self.rng = payloads
+
+    def reseed(self, *parts) -> None:
+        """Fresh random stream per (scenario, level, phase), so a run's workload does not depend on scenario order."""
+        self.rng = random.Random(":".join(str(p) for p in (self.seed, *parts)))
+
+    def user(self, i):
+        return self.users[i % len(self.users)]
+
+    @staticmethod
+    def auth(token):
+        return {"Authorization": f"Bearer {token}"}
+
+
+async def sc_register(c, ctx, i):
+    n = next(ctx.counter)
+    return await c.post("/api/auth/register", json={"email": f"bench-{ctx.run_id}-{n}@example.com", "password": "bench-pass", "name": "Bench"})
+
+
+async def sc_login(c, ctx, i):
+    email, password, _ = ctx.user(i)
+    return await c.post("/api/auth/login", json={"email": email, "password": password})
+
+
+async def sc_me(c, ctx, i):
+    return await c.get("/api/auth/me", headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_identity_verify(c, ctx, i):
+    return await c.post("/api/identity/verify", files={"video": ("selfie.mp4", ctx.video, "video/mp4")}, headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_app_verify(c, ctx, i):
+    n = ctx.rng.randint(1, 2000)
+    return await c.post("/api/app/verify", data={"package_name": f"com.official.app{n}"}, headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_app_verify_apk(c, ctx, i):
+    return await c.post("/api/app/verify", files={"apk": ("app.apk", ctx.apk, "application/octet-stream")}, headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_app_verify_batch(c, ctx, i):
+    items = [{"package_name": f"com.official.app{ctx.rng.randint(1, 2000)}"} for _ in range(50)]
+    return await c.post("/api/app/verify/batch", json={"items": items}, headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_grievance_file(c, ctx, i):
+    text = ctx.rng.choice(["UPI transfer failed but money debited", "Card used for fraud purchase", "Loan EMI charged twice"])
+    return await c.post("/api/grievance/file", json={"text": f"{text} ref {next(ctx.counter)}"}, headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_grievance_status(c, ctx, i):
+    complaint_id, token = ctx.complaints[i % len(ctx.complaints)]
+    return await c.get(f"/api/grievance/status/{complaint_id.replace('#', '%23')}", headers=ctx.auth(token))
+
+
+async def sc_grievance_analytics(c, ctx, i):
+    return await c.get("/api/grievance/analytics", headers=ctx.auth(ctx.user(i)[2]))
+
+
+async def sc_analytics_timeseries(c, ctx, i):
+    return await c.get("/api/grievance/analytics/timeseries?bucket=day", headers=ctx.auth(ctx.user(i)[2]))
+
+
+SCENARIOS = {
+    "register": sc_register,
+    "login": sc_login,
+    "me": sc_me,
+    "identity_verify": sc_identity_verify,
+    "app_verify": sc_app_verify,
+    "app_verify_apk": sc_app_verify_apk,
+    "app_verify_batch": sc_app_verify_batch,
+    "grievance_file": sc_grievance_file,
+    "grievance_status": sc_grievance_status,
+    "grievance_analytics": sc_grievance_analytics,
+    "analytics_timeseries": sc_analytics_timeseries,
+}
+
+
+async def prepare(c, ctx, users: int) -> None:
+    async def one(n):
+        email = f"bench-{ctx.run_id}-user{n}@example.com"
+        r = await c.post("/api/auth/register", json={"email": email, "password": "bench-pass", "name": "Bench"})
+        r.raise_for_status()
+        token = r.json()["data"]["token"]
+        ctx.users.append((email, "bench-pass", token))
+        r = await c.post("/api/grievance/file", json={"text": f"seed complaint {n}"}, headers=ctx.auth(token))
+        r.raise_for_status()
+        ctx.complaints.append((r.json()["data"]["complaint_id"], token))
+
+    sem = asyncio.Semaphore(8)
+
+    async def bounded(n):
+        async with sem:
+            await one(n)
+
+    await asyncio.gather(*(bounded(n) for n in range(users)))
+
+
+# ----- driver -----
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    # Nearest rank: the smallest value with at least p% of the samples at or below it
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def drive(c, ctx, scenario, concurrency: int, duration: float):
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker(i):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                r = await scenario(c, ctx, i)
+                code = str(r.status_code)
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            statuses[code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    ok = sum(n for code, n in statuses.items() if code.startswith("2"))
+    result = {
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        "statuses": dict(statuses),
+    }
+    for p in PERCENTILES:
+        value = _percentile(latencies, p)
+        result[f"p{p}_ms"] = round(value, 3) if value is not None else None
+    return result
+
+
+async def run_scenarios(base_url, args):
+    ctx = Context(uuid.uuid4().hex[:8], args.seed)
+    levels = [int(x) for x in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels) + 8, max_keepalive_connections=max(levels) + 8)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as c:
+        await prepare(c, ctx, args.users)
+        for name in args.scenarios.split(","):
+            scenario = SCENARIOS[name]
+            results[name] = {}
+            for level in levels:
+                if args.warmup:
+                    ctx.reseed(name, level, "warmup")
+                    await drive(c, ctx, scenario, level, args.warmup)
+                ctx.reseed(name, level)
+                r = await drive(c, ctx, scenario, level, args.duration)
+                results[name][str(level)] = r
+                print(f"{name:22} c={level:<4} {r['throughput_rps']:>9.1f} req/s  p50={r['p50_ms']}ms "
+                      f"p95={r['p95_ms']}ms p99={r['p99_ms']}ms errors={r['errors']}", flush=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args) -> int:
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        print(f"unknown scenarios: {', '.join(sorted(unknown))} (known: {', '.join(SCENARIOS)})", file=sys.stderr)
+        return 2
+
+    with ExitStack() as stack:
+        server_dsn = args.dsn or stack.enter_context(local_postgres(args.pg_bin))
+        dsn = stack.enter_context(scratch_database(server_dsn))
+
+        logs = args.log_dir or stack.enter_context(tempfile.TemporaryDirectory(prefix="trustguard-loadtest-"))
+        os.makedirs(logs, exist_ok=True)
+        stub_port = _free_port()
+        stack.enter_context(process(
+            [sys.executable, os.path.join(PERF_DIR, "stubs.py"), "--port", str(stub_port),
+             "--identity-latency-ms", str(args.identity_latency_ms),
+             "--grievance-latency-ms", str(args.grievance_latency_ms)],
+            os.path.join(logs, "stubs.log"),
+            health=f"http://127.0.0.1:{stub_port}/health",
+        ))
+
+        api_port = _free_port()
+        stub_url = f"http://127.0.0.1:{stub_port}"
+        env = {
+            **os.environ,
+            "DATABASE_URL": _dsn_url(dsn),
+            "IDENTITY_SERVICE_URL": stub_url,
+            "GRIEVANCE_SERVICE_URL": stub_url,
+            "JWT_SECRET": "loadtest",
+            "ID_NODE_ID": "0",
+            "ID_LOCK_DIR": stack.enter_context(tempfile.TemporaryDirectory(prefix="trustguard-ids-")),
+        }
+        stack.enter_context(process(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(api_port),
+             "--workers", str(args.api_workers), "--log-level", "warning"],
+            os.path.join(logs, "api.log"),
+            env=env,
+            health=f"http://127.0.0.1:{api_port}/health",
+            timeout=120.0,
+        ))
+        seed(dsn, args.seed_grievances, args.seed_apps, args.seed)
+        time.sleep(1.0)  # let the registry listener apply the reload
+        results = asyncio.run(run_scenarios(f"http://127.0.0.1:{api_port}", args))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "seed": args.seed,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("func", "dsn")},
+        },
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"wrote {args.out}")
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+def cmd_compare(args) -> int:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = 0
+    print(f"{'scenario':22} {'c':>4} {'req/s':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    for name, levels in new["results"].items():
+        for level, r in levels.items():
+            b = base["results"].get(name, {}).get(level)
+            if not b:
+                continue
+            cells = []
+            flagged = False
+            for key, higher_is_better in (("throughput_rps", True), ("p95_ms", False), ("p99_ms", False)):
+                old, cur = b.get(key), r.get(key)
+                if not old or cur is None:
+                    cells.append(f"{'-':>22}")
+                    continue
+                change = (cur - old) / old
+                worse = -change if higher_is_better else change
+                mark = " !" if worse > args.threshold else "  "
+                flagged |= worse > args.threshold
+                cells.append(f"{old:>8.1f} -> {cur:>8.1f}{mark}")
+            regressions += flagged
+            print(f"{name:22} {level:>4} " + " ".join(cells))
+    if regressions:
+        print(f"{regressions} scenario/concurrency pairs regressed by more than {args.threshold:.0%}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API against local stand-ins")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="start the stack and drive the scenarios")
+    run.add_argument("--dsn", help="existing Postgres server to create the scratch database on (default: throwaway initdb)")
+    run.add_argument("--pg-bin", default=os.getenv("PG_BIN"), help="directory containing initdb and pg_ctl")
+    run.add_argument("--scenarios", default=",".join(SCENARIOS))
+    run.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    run.add_argument("--duration", type=float, default=10.0, help="seconds per scenario and level")
+    run.add_argument("--warmup", type=float, default=2.0, help="seconds discarded before each measurement")
+    run.add_argument("--users", type=int, default=50, help="users registered before measuring")
+    run.add_argument("--api-workers", type=int, default=1)
+    run.add_argument("--identity-latency-ms", type=float, default=50.0)
+    run.add_argument("--grievance-latency-ms", type=float, default=10.0)
+    run.add_argument("--seed-grievances", type=int, default=50000)
+    run.add_argument("--seed-apps", type=int, default=10000)
+    run.add_argument("--request-timeout", type=float, default=30.0)
+    run.add_argument("--seed", type=int, default=0, help="seeds the request payloads and parameters of every scenario")
+    run.add_argument("--log-dir", help="keep the stub and API logs here (default: a temporary directory)")
+    run.add_argument("--out", help="write the JSON report here instead of stdout")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="diff two JSON reports")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    compare.add_argument("--fail-on-regression", action="store_true")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Stand-ins for identity-ml and grievance-ml with configurable latency, for load tests.
+Serves /predict, /categorize, /categorize/batch and /health on one port.
+
+    python perf/stubs.py --port 5901 --identity-latency-ms 80 --grievance-latency-ms 15
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIES = [
+    "unauthorized_debit",
+    "loan_dispute",
+    "account_closure",
+    "failed_transfer",
+    "card_fraud",
+    "digital_service_issue",
+    "other",
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    identity_latency = 0.0
+    grievance_latency = 0.0
+    jitter = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _sleep(self, base: float) -> None:
+        if base > 0:
+            time.sleep(max(0.0, random.gauss(base, base * self.jitter)))
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("content-length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, payload, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send({"success": True, "statusCode": 200, "data": {"service": "stub", "model_version": "stub-1"}})
+        else:
+            self._send({"error": "not found"}, 404)
+
+    def do_POST(self):
+        body = self._body()
+        if self.path == "/predict":
+            self._sleep(self.identity_latency)
+            score = (zlib.crc32(body[:4096]) % 1000) / 1000.0
+            self._send({
+                "deepfake_score": score,
+                "liveness_status": "PASS" if score < 0.8 else "FAIL",
+                "overall_result": "VERIFIED" if score < 0.5 else "REVIEW",
+            })
+        elif self.path == "/categorize":
+            self._sleep(self.grievance_latency)
+            text = json.loads(body or b"{}").get("text", "")
+            self._send({"category": _category(text), "confidence": 0.9, "model_version": "stub-1"})
+        elif self.path == "/categorize/batch":
+            self._sleep(self.grievance_latency)
+            texts = json.loads(body or b"{}").get("texts", [])
+            self._send({
+                "results": [{"category": _category(t), "confidence": 0.9} for t in texts],
+                "model_version": "stub-1",
+            })
+        else:
+            self._send({"error": "not found"}, 404)
+
+
+def _category(text: str) -> str:
+    return CATEGORIES[zlib.crc32(text.encode("utf-8")) % len(CATEGORIES)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Latency-configurable ML service stubs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5901)
+    parser.add_argument("--identity-latency-ms", type=float, default=50.0)
+    parser.add_argument("--grievance-latency-ms", type=float, default=10.0)
+    parser.add_argument("--jitter", type=float, default=0.1, help="latency standard deviation as a fraction of the mean")
+    args = parser.parse_args(argv)
+
+    StubHandler.identity_latency = args.identity_latency_ms / 1000.0
+    StubHandler.grievance_latency = args.grievance_latency_ms / 1000.0
+    StubHandler.jitter = args.jitter
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"stubs listening on {args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Bulk import for the app registry (official_apps / suspicious_apps).
+- Streams CSV or NDJSON through validation into a temp staging table with COPY
+- Upserts staging into the target table in a single statement
+- Memory stays flat regardless of file size; reports inserted/updated/rejected counts
+
+CLI:
+    python registry_import.py apps.csv --target official
+    cat apps.ndjson | python registry_import.py - --target suspicious --format ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+import time
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from database import transaction
+
+TARGETS = ("official", "suspicious")
+FORMATS = ("csv", "ndjson")
+COLUMNS = ["line_no", "package_name", "sha256_hash", "publisher", "google_play_link", "confidence"]
+MAX_ERROR_SAMPLES = 20
+
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+
+_OFFICIAL_UPSERT = """
+WITH src AS (
+    SELECT DISTINCT ON (package_name) package_name, sha256_hash, publisher, google_play_link
+    FROM registry_staging
+    ORDER BY package_name, line_no DESC
+), up AS (
+    INSERT INTO official_apps(package_name, sha256_hash, publisher, google_play_link, last_verified)
+    SELECT package_name, sha256_hash, publisher, google_play_link, NOW() FROM src
+    ON CONFLICT (package_name) DO UPDATE SET
+        sha256_hash = EXCLUDED.sha256_hash,
+        publisher = EXCLUDED.publisher,
+        google_play_link = EXCLUDED.google_play_link,
+        last_verified = NOW()
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT COUNT(*) FILTER (WHERE inserted) AS inserted, COUNT(*) FILTER (WHERE NOT inserted) AS updated FROM up
+"""
+
+# suspicious_apps has no unique key on package_name, so update matches and insert the rest in one statement
+_SUSPICIOUS_UPSERT = """
+WITH src AS (
+    SELECT DISTINCT ON (package_name) package_name, publisher, google_play_link, confidence
+    FROM registry_staging
+    ORDER BY package_name, line_no DESC
+), upd AS (
+    UPDATE suspicious_apps s SET
+        publisher = src.publisher,
+        google_play_link = src.google_play_link,
+        confidence = COALESCE(src.confidence, s.confidence)
+    FROM src
+    WHERE s.package_name = src.package_name
+    RETURNING s.package_name
+), ins AS (
+    INSERT INTO suspicious_apps(package_name, publisher, google_play_link, confidence)
+    SELECT package_name, publisher, google_play_link, COALESCE(confidence, 0.8) FROM src
+    WHERE NOT EXISTS (SELECT 1 FROM suspicious_apps s WHERE s.package_name = src.package_name)
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM ins) AS inserted, (SELECT COUNT(DISTINCT package_name) FROM upd) AS updated
+"""
+
+
+class RegistryImportError(ValueError):
+    pass
+
+
+class _Report:
+    def __init__(self):
+        self.received = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, line_no: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append({"line": line_no, "error": reason})
+
+
+def _clean(value: Any, max_len: Optional[int] = None) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    if max_len is not None and len(value) > max_len:
+        raise ValueError(f"value longer than {max_len} characters")
+    return value
+
+
+def _validate(line_no: int, rec: Dict[str, Any]) -> List[Any]:
+    package_name = _clean(rec.get("package_name"), 255)
+    if not package_name:
+        raise ValueError("package_name is required")
+    sha256_hash = _clean(rec.get("sha256_hash"), 64)
+    if sha256_hash is not None:
+        if not _SHA256_RE.match(sha256_hash):
+            raise ValueError("sha256_hash must be 64 hex characters")
+        sha256_hash = sha256_hash.lower()
+    confidence = _clean(rec.get("confidence"))
+    if confidence is not None:
+        confidence = float(confidence)
+        if not 0.0 <= confidence <= 1.0:
+            raise ValueError("confidence must be between 0 and 1")
+    return [
+        line_no,
+        package_name,
+        sha256_hash,
+        _clean(rec.get("publisher"), 255),
+        _clean(rec.get("google_play_link")),
+        confidence,
+    ]
+
+
+def _records(fileobj: BinaryIO, fmt: str, report: _Report) -> Iterator[tuple]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", errors="replace", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for rec in reader:
+            yield reader.line_num, rec
+    else:
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                report.received += 1
+                report.reject(line_no, "invalid JSON")
+                continue
+            if not isinstance(rec, dict):
+                report.received += 1
+                report.reject(line_no, "expected a JSON object")
+                continue
+            yield line_no, rec
+
+
+def _valid_rows(fileobj: BinaryIO, fmt: str, report: _Report) -> Iterator[List[Any]]:
+    for line_no, rec in _records(fileobj, fmt, report):
+        report.received += 1
+        try:
+            yield _validate(line_no, rec)
+        except (TypeError, ValueError) as e:
+            report.reject(line_no, str(e))
+
+
+class _CopyStream:
+    """File-like object feeding rows to COPY ... FROM STDIN as CSV without materialising the input."""
+
+    def __init__(self, rows: Iterator[List[Any]]):
+        self._rows = rows
+        self._buf = ""
+        self._out = io.StringIO()
+        self._writer = csv.writer(self._out)
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buf) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self._buf += self._out.getvalue()
+            self._out.seek(0)
+            self._out.truncate()
+        if size < 0:
+            data, self._buf = self._buf, ""
+        else:
+            data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+
+
+def detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def import_registry(fileobj: BinaryIO, target: str = "official", fmt: str = "csv") -> Dict[str, Any]:
+    if target not in TARGETS:
+        raise RegistryImportError(f"target must be one of {', '.join(TARGETS)}")
+    if fmt not in FORMATS:
+        raise RegistryImportError(f"format must be one of {', '.join(FORMATS)}")
+    start = time.time()
+    report = _Report()
+    with transaction() as cur:
+        # Row triggers stay quiet; the registry index gets one reload notification on commit
+        cur.execute("SET LOCAL trustguard.bulk_import = 'on'")
+        cur.execute(
+            """
+            CREATE TEMP TABLE registry_staging (
+                line_no BIGINT,
+                package_name TEXT,
+                sha256_hash TEXT,
+                publisher TEXT,
+                google_play_link TEXT,
+                confidence DOUBLE PRECISION
+            ) ON COMMIT DROP
+            """
+        )
+        cur.copy_expert(
+            f"COPY registry_staging ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            _CopyStream(_valid_rows(fileobj, fmt, report)),
+        )
+        cur.execute("ANALYZE registry_staging")
+        cur.execute(_OFFICIAL_UPSERT if target == "official" else _SUSPICIOUS_UPSERT)
+        counts = dict(cur.fetchone())
+        cur.execute("SELECT pg_notify('app_registry', json_build_object('op', 'RELOAD')::text)")
+    staged = report.received - report.rejected
+    return {
+        "target": target,
+        "format": fmt,
+        "received": report.received,
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
+        "rejected": report.rejected,
+        "duplicates": staged - counts["inserted"] - counts["updated"],
+        "errors": report.errors,
+        "latency_ms": int((time.time() - start) * 1000),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import official/suspicious apps via COPY")
+    parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument("--target", choices=TARGETS, default="official")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="defaults to the file extension")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(None if args.path == "-" else args.path)
+    if args.path == "-":
+        result = import_registry(sys.stdin.buffer, args.target, fmt)
+    else:
+        with open(args.path, "rb") as f:
+            result = import_registry(f, args.target, fmt)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
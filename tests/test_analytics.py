@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+import analytics
+
+
+def _entry(b, by_category):
+    entry = analytics._empty_bucket(b)
+    entry["by_category"] = dict(by_category)
+    entry["total"] = sum(by_category.values())
+    return entry
+
+
+def test_closed_bucket_with_pending_rows_is_not_cached(monkeypatch):
+    now = datetime(2026, 1, 2, 12, 30, tzinfo=timezone.utc)
+    pending_hour = datetime(2026, 1, 2, 10, tzinfo=timezone.utc)
+    settled_hour = datetime(2026, 1, 2, 11, tzinfo=timezone.utc)
+    fetched = {
+        pending_hour: _entry(pending_hour, {"pending": 2, "other": 1}),
+        settled_hour: _entry(settled_hour, {"other": 3}),
+    }
+    monkeypatch.setattr(analytics, "_query_buckets", lambda bucket, start, end: fetched)
+    monkeypatch.setattr(analytics, "_window_percentiles", lambda start, end, closed: {})
+    monkeypatch.setattr(analytics, "closed_buckets", analytics.TTLCache("test", ttl=60))
+
+    analytics.timeseries("hour", start=pending_hour, end=now, now=now)
+
+    assert analytics.closed_buckets.get(("hour", settled_hour)) is not None
+    assert analytics.closed_buckets.get(("hour", pending_hour)) is None
+    assert analytics.closed_buckets.get(("hour", pending_hour + timedelta(hours=2))) is None
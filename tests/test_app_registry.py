@@ -0,0 +1,25 @@
+import time
+
+import app_registry
+from app_registry import AppRegistryIndex
+
+
+def _loaded_index():
+    index = AppRegistryIndex()
+    index._official.put({"id": 1, "package_name": "com.bank", "sha256_hash": "ab", "publisher": "Bank"})
+    index.ready = True
+    return index
+
+
+def test_fingerprint_requires_a_connected_listener():
+    index = _loaded_index()
+    assert index.fingerprint("official_apps") is None
+    index.synced_at = time.monotonic()
+    assert index.fingerprint("official_apps") is not None
+
+
+def test_fingerprint_withheld_while_listener_lags():
+    index = _loaded_index()
+    index.synced_at = time.monotonic() - app_registry.APP_REGISTRY_MAX_LAG_SECONDS - 1
+    assert not index.in_sync()
+    assert index.fingerprint("official_apps") is None
@@ -0,0 +1,22 @@
+import auth_cache
+
+
+def test_invalidate_user_drops_cached_profile(monkeypatch):
+    monkeypatch.setattr(auth_cache, "profile_cache", auth_cache.TTLCache("test", ttl=60))
+    rows = {7: {"id": 7, "email": "a@example.com", "name": "Old"}}
+    load = lambda user_id: dict(rows[user_id]) if user_id in rows else None
+
+    assert auth_cache.user_profile(7, load)["name"] == "Old"
+    rows[7]["name"] = "New"
+    assert auth_cache.user_profile(7, load)["name"] == "Old"
+    auth_cache.invalidate_user(7)
+    assert auth_cache.user_profile(7, load)["name"] == "New"
+
+
+def test_missing_users_are_not_cached(monkeypatch):
+    monkeypatch.setattr(auth_cache, "profile_cache", auth_cache.TTLCache("test", ttl=60))
+    rows = {}
+    load = lambda user_id: rows.get(user_id)
+    assert auth_cache.user_profile(8, load) is None
+    rows[8] = {"id": 8, "email": "b@example.com", "name": "B"}
+    assert auth_cache.user_profile(8, load) == rows[8]
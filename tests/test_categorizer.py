@@ -0,0 +1,28 @@
+import categorizer
+from categorizer import Categorizer
+
+
+def test_version_change_from_health_invalidates_cache(monkeypatch):
+    cat = Categorizer()
+    cat._observe_version("v1")
+    cat._store(categorizer.text_hash("card stolen"), {"category": "card_fraud", "confidence": 0.9})
+    assert len(cat.local) == 1
+
+    monkeypatch.setattr(categorizer.grievance_client, "health", lambda: {"model_version": "v2"})
+    cat.refresh_version()
+    assert cat.model_version == "v2"
+    assert len(cat.local) == 0
+
+
+def test_failed_version_check_keeps_cache(monkeypatch):
+    cat = Categorizer()
+    cat._observe_version("v1")
+    cat._store(categorizer.text_hash("card stolen"), {"category": "card_fraud", "confidence": 0.9})
+
+    def down():
+        raise categorizer.MLServiceError("grievance ML service error 503", 503)
+
+    monkeypatch.setattr(categorizer.grievance_client, "health", down)
+    cat.refresh_version()
+    assert cat.model_version == "v1"
+    assert len(cat.local) == 1
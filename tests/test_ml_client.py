@@ -0,0 +1,90 @@
+import asyncio
+import socket
+import threading
+
+import httpx
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from ml_client import CircuitOpenError, MLClient
+
+
+@pytest.fixture
+def silent_server():
+    """A socket that accepts connections and never answers."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    accepted = []
+    stop = threading.Event()
+
+    def accept():
+        sock.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                accepted.append(sock.accept()[0])
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    stop.set()
+    thread.join()
+    for conn in accepted:
+        conn.close()
+    sock.close()
+
+
+def _half_open_client(url):
+    client = MLClient("test", url, timeout=30.0, retries=0)
+    breaker = client.breaker
+    for _ in range(breaker.min_calls):
+        breaker.record_failure("boom")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    breaker.record_probe(True)
+    assert breaker.state == HALF_OPEN
+    return client
+
+
+def test_cancelled_half_open_trial_releases_its_slot(silent_server):
+    client = _half_open_client(silent_server)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.apost_json("/predict", json={}), timeout=0.2)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert client.breaker.state == HALF_OPEN
+    assert client.breaker.allow()
+    # The slot it freed is the only one: a second concurrent trial is still refused
+    assert not client.breaker.allow()
+
+
+def test_half_open_trial_outcome_is_recorded():
+    # Nothing listens on this port: the trial fails and the breaker re-opens
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = _half_open_client(f"http://127.0.0.1:{port}")
+    with pytest.raises(httpx.ConnectError):
+        client.post_json("/predict", json={})
+    client.close()
+    assert client.breaker.state == OPEN
+    assert not client.breaker.allow()
+    client.breaker.record_probe(True)
+    assert client.breaker.allow()
+    client.breaker.record_success()
+    assert client.breaker.state == CLOSED
+
+
+def test_open_circuit_rejects_without_calling_the_service(silent_server):
+    client = _half_open_client(silent_server)
+    client.breaker.record_failure("trial failed")
+    assert client.breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as info:
+        client.post_json("/predict", json={})
+    assert info.value.status_code == 503
+    client.close()
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+import pytest
+
+from passwords import PasswordHasher
+
+
+def _slow(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_cancelled_caller_keeps_slot_until_job_finishes():
+    hasher = PasswordHasher(workers=1, queue_max=1, login_max=1)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hasher._run(_slow, 1.0), timeout=0.1)
+        # The job is still running in the pool, so its slot is still taken
+        assert hasher.stats()["in_flight"] == 1
+        assert not hasher._slots.acquire(blocking=False)
+        for _ in range(100):
+            if hasher.stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert hasher.stats()["in_flight"] == 0
+        assert await hasher._run(_slow, 0.0) == 0.0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
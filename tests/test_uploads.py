@@ -0,0 +1,90 @@
+from fastapi import APIRouter, FastAPI, File, UploadFile
+from starlette.formparsers import MultiPartParser
+from starlette.testclient import TestClient
+
+import uploads
+from uploads import SpooledUploadRoute, UploadLimitMiddleware
+
+
+def _app(limit: int):
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": limit}, overhead=0)
+    handled = []
+
+    @app.post("/upload")
+    async def upload(video: UploadFile = File(...)):
+        handled.append(video.filename)
+        return {}
+
+    @app.post("/other")
+    async def other(video: UploadFile = File(...)):
+        return {}
+
+    return TestClient(app), handled
+
+
+def _multipart(size: int):
+    boundary = "b0undary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="video"; filename="v.mp4"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode() + b"x" * size + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def test_rejects_from_content_length():
+    client, handled = _app(limit=100)
+    body, headers = _multipart(200)
+    response = client.post("/upload", content=body, headers=headers)
+    assert response.status_code == 413
+    assert handled == []
+
+
+def test_rejects_chunked_body_without_content_length():
+    client, handled = _app(limit=100)
+    body, headers = _multipart(200)
+
+    def chunks():
+        for i in range(0, len(body), 32):
+            yield body[i:i + 32]
+
+    response = client.post("/upload", content=chunks(), headers=headers)
+    assert response.status_code == 413
+    assert response.json() == {"detail": "upload exceeds 100 bytes"}
+    assert handled == []
+
+
+def test_bodies_under_the_limit_and_other_paths_pass():
+    client, handled = _app(limit=1000)
+    body, headers = _multipart(200)
+    assert client.post("/upload", content=body, headers=headers).status_code == 200
+    assert handled == ["v.mp4"]
+    body, headers = _multipart(2000)
+    assert client.post("/other", content=body, headers=headers).status_code == 200
+
+
+def test_spool_threshold_applies_only_to_spooled_routes(monkeypatch):
+    monkeypatch.setattr(uploads.SpooledMultiPartParser, "max_file_size", 16)
+    default_size = MultiPartParser.max_file_size
+    app = FastAPI()
+    router = APIRouter(route_class=SpooledUploadRoute)
+    rolled = {}
+
+    @app.post("/default")
+    async def default(video: UploadFile = File(...)):
+        rolled["default"] = video.file._rolled
+        return {}
+
+    @router.post("/spooled")
+    async def spooled(video: UploadFile = File(...)):
+        rolled["spooled"] = video.file._rolled
+        return {}
+
+    app.include_router(router)
+    client = TestClient(app)
+    files = {"video": ("v.mp4", b"x" * 64, "video/mp4")}
+    assert client.post("/default", files=files).status_code == 200
+    assert client.post("/spooled", files=files).status_code == 200
+    assert rolled == {"default": False, "spooled": True}
+    assert MultiPartParser.max_file_size == default_size
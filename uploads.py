@@ -0,0 +1,202 @@
+"""
+Streaming helpers for file uploads.
+- Reads UploadFile contents in fixed-size chunks so memory per request stays bounded
+- Enforces size limits while streaming instead of after buffering
+- Re-encodes a single file as a streamed multipart/form-data body for forwarding
+- Hashes uploads incrementally in a worker thread, off the event loop
+- Per-route request parser with its own spool threshold, leaving Starlette's MultiPartParser untouched
+- ASGI middleware capping request bodies per path, including chunked bodies without Content-Length
+"""
+import asyncio
+import hashlib
+import os
+import secrets
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from multipart.multipart import parse_options_header
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+# Uploads larger than this are spooled to a temp file on disk instead of kept in memory
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(1024 * 1024)))
+IDENTITY_MAX_VIDEO_BYTES = int(os.getenv("IDENTITY_MAX_VIDEO_BYTES", str(50 * 1024 * 1024)))
+# Slack on top of a file limit for the multipart boundaries and part headers
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds its size limit."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+def upload_size(upload: UploadFile) -> Optional[int]:
+    """Size of a spooled upload without reading it; None if the file is not seekable."""
+    if upload.size is not None:
+        return upload.size
+    try:
+        pos = upload.file.tell()
+        size = upload.file.seek(0, os.SEEK_END)
+        upload.file.seek(pos)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+async def iter_upload(upload: UploadFile, max_bytes: Optional[int] = None, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    await upload.seek(0)
+    total = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        yield chunk
+
+
+def multipart_file_body(
+    field: str,
+    upload: UploadFile,
+    max_bytes: Optional[int] = None,
+) -> Tuple[Dict[str, str], Callable[[], AsyncIterator[bytes]]]:
+    """
+    Build headers and a body factory that streams `upload` as one multipart/form-data file field.
+    The factory restarts from the beginning of the upload each time it is called, so retries can replay it.
+    """
+    boundary = secrets.token_hex(16)
+    filename = (upload.filename or "upload").replace('"', "%22").replace("\r", "").replace("\n", "")
+    content_type = upload.content_type or "application/octet-stream"
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    size = upload_size(upload)
+    if size is not None:
+        if max_bytes is not None and size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        headers["Content-Length"] = str(len(head) + size + len(tail))
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        async for chunk in iter_upload(upload, max_bytes):
+            yield chunk
+        yield tail
+
+    return headers, body
+
+
+def _sha256_file(fileobj, chunk_size: int) -> str:
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def sha256_upload(upload: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """SHA-256 of an upload, read and hashed chunk by chunk in a worker thread."""
+    return await asyncio.to_thread(_sha256_file, upload.file, chunk_size)
+
+
+class SpooledMultiPartParser(MultiPartParser):
+    max_file_size = UPLOAD_SPOOL_MAX_BYTES
+
+
+class SpooledUploadRequest(Request):
+    """Request whose multipart form files spool to disk past UPLOAD_SPOOL_MAX_BYTES."""
+
+    async def _get_form(
+        self,
+        *,
+        max_files: Union[int, float] = 1000,
+        max_fields: Union[int, float] = 1000,
+    ) -> FormData:
+        if self._form is None:
+            content_type, _ = parse_options_header(self.headers.get("Content-Type"))
+            if content_type == b"multipart/form-data":
+                parser = SpooledMultiPartParser(self.headers, self.stream(), max_files=max_files, max_fields=max_fields)
+                try:
+                    self._form = await parser.parse()
+                except MultiPartException as exc:
+                    raise HTTPException(status_code=400, detail=exc.message)
+        return await super()._get_form(max_files=max_files, max_fields=max_fields)
+
+
+class SpooledUploadRoute(APIRoute):
+    """Route class for upload endpoints; parses forms with SpooledUploadRequest."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            return await handler(SpooledUploadRequest(request.scope, request.receive))
+
+        return route_handler
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects request bodies over a per-path limit with 413.
+    Content-Length is checked up front; chunked bodies are counted as they are received,
+    so the parse is cut off as soon as the limit is crossed instead of after spooling everything.
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int], overhead: int = MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.limits = limits
+        self.overhead = overhead
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        max_body = limit + self.overhead
+        rejection = JSONResponse(status_code=413, content={"detail": f"upload exceeds {limit} bytes"})
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > max_body:
+            await rejection(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    if not started and not rejected:
+                        rejected = True
+                        await rejection(scope, receive, send)
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal started
+            # The 413 has been sent; drop whatever the app answers after its parse fails
+            if rejected:
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if not rejected:
+                raise
@@ -0,0 +1,207 @@
+"""
+Write-behind buffer for identity_checks.
+- Rows get their id from ids.py up front, so callers respond without waiting for the INSERT
+- A flusher thread writes buffered rows as one multi-row INSERT when IDENTITY_WRITE_BATCH rows are
+  queued or IDENTITY_WRITE_FLUSH_MS has passed
+- Failed flushes keep the rows and retry; ON CONFLICT (id) DO NOTHING makes retries idempotent
+- A batch rejected for its data (constraint or value errors) is bisected so only the offending rows are
+  logged and dropped, and one bad row cannot stall the rows queued behind it
+- IDENTITY_WRITE_SYNC=1 (or wait_flushed) makes a caller wait until its row is committed
+- stop() drains the buffer on shutdown
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import psycopg2
+import psycopg2.extras
+
+import ids
+from database import get_cursor
+
+logger = logging.getLogger("trustguard")
+
+IDENTITY_WRITE_BATCH = int(os.getenv("IDENTITY_WRITE_BATCH", "500"))
+IDENTITY_WRITE_FLUSH_MS = float(os.getenv("IDENTITY_WRITE_FLUSH_MS", "200"))
+# Ids of rows dropped for bad data, remembered so wait_flushed can report them
+_DROPPED_REMEMBERED = 1024
+
+# Beyond this many unflushed rows add() raises WriteBufferFull and callers insert directly
+IDENTITY_WRITE_MAX_PENDING = int(os.getenv("IDENTITY_WRITE_MAX_PENDING", "20000"))
+IDENTITY_WRITE_RETRY_SECONDS = float(os.getenv("IDENTITY_WRITE_RETRY_SECONDS", "1"))
+IDENTITY_WRITE_SYNC = os.getenv("IDENTITY_WRITE_SYNC", "0").lower() in ("1", "true", "yes")
+# With SYNC, how long a request waits for its row before answering 503
+IDENTITY_WRITE_SYNC_TIMEOUT = float(os.getenv("IDENTITY_WRITE_SYNC_TIMEOUT", "5"))
+
+COLUMNS = ("id", "user_id", "deepfake_score", "liveness_status", "overall_result", "latency_ms", "created_at")
+
+_INSERT = f"""
+    INSERT INTO identity_checks({", ".join(COLUMNS)})
+    VALUES %s
+    ON CONFLICT (id) DO NOTHING
+"""
+
+
+class WriteBufferFull(Exception):
+    """The buffer is at IDENTITY_WRITE_MAX_PENDING rows (usually because the database is failing)."""
+
+
+class IdentityCheckWriter:
+    def __init__(self, batch: int, flush_ms: float, max_pending: int):
+        self.batch = batch
+        self.flush_interval = flush_ms / 1000.0
+        self.max_pending = max_pending
+        # id -> row, in insertion order; rows stay here until their INSERT commits
+        self._rows: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._dropped: "OrderedDict[int, None]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flush_now = False
+        self.rows_written = 0
+        self.batches = 0
+        self.errors = 0
+        self.rows_dropped = 0
+        self.last_flush_ms = 0.0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="identity-check-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush what is buffered and stop the flusher; rows still unwritten after `timeout` are logged."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        with self._cond:
+            left = len(self._rows)
+        if left:
+            logger.error("identity check writer stopped with %s unwritten rows", left)
+
+    def add(self, user_id: int, deepfake_score: float, liveness_status: str, overall_result: str, latency_ms: int) -> Dict[str, Any]:
+        """Queue one row and return it (with its pre-allocated id and created_at)."""
+        row = {
+            "id": ids.next_id(),
+            "user_id": user_id,
+            "deepfake_score": deepfake_score,
+            "liveness_status": liveness_status,
+            "overall_result": overall_result,
+            "latency_ms": latency_ms,
+            "created_at": datetime.now(timezone.utc),
+        }
+        with self._cond:
+            if len(self._rows) >= self.max_pending or self._thread is None or self._stopping:
+                raise WriteBufferFull(f"{len(self._rows)} identity checks waiting to be written")
+            self._rows[row["id"]] = row
+            if len(self._rows) >= self.batch:
+                self._cond.notify_all()
+        return row
+
+    def pending(self, row_id: int) -> Optional[Dict[str, Any]]:
+        """A row that is queued but not yet committed, so reads can see it before the flush."""
+        with self._cond:
+            row = self._rows.get(row_id)
+            return dict(row) if row else None
+
+    def wait_flushed(self, row_id: int, timeout: Optional[float] = None) -> bool:
+        """Block until `row_id` is committed; triggers an immediate flush. False on timeout or if the row was dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_now = True
+            self._cond.notify_all()
+            while row_id in self._rows:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return row_id not in self._dropped
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or self._flush_now or len(self._rows) >= self.batch,
+                    timeout=self.flush_interval,
+                )
+                self._flush_now = False
+                stopping = self._stopping
+                batch = list(self._rows.values())[: self.batch]
+            if batch:
+                if not self._write(batch):
+                    if stopping:
+                        return
+                    time.sleep(IDENTITY_WRITE_RETRY_SECONDS)
+                    continue
+                with self._cond:
+                    more = len(self._rows) > 0
+                if more and (stopping or len(batch) == self.batch):
+                    continue
+            if stopping:
+                return
+
+    def _write(self, batch) -> bool:
+        """Write `batch`; False means the database is failing and the unwritten rows stay queued."""
+        start = time.perf_counter()
+        try:
+            with get_cursor() as cur:
+                psycopg2.extras.execute_values(
+                    cur, _INSERT, [tuple(r[c] for c in COLUMNS) for r in batch], page_size=len(batch)
+                )
+        except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+            if len(batch) > 1:
+                mid = len(batch) // 2
+                return self._write(batch[:mid]) and self._write(batch[mid:])
+            self._drop(batch[0], e)
+            return True
+        except Exception as e:
+            with self._cond:
+                self.errors += 1
+            logger.warning("identity check flush of %s rows failed: %s", len(batch), str(e))
+            return False
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with self._cond:
+            for r in batch:
+                self._rows.pop(r["id"], None)
+            self.rows_written += len(batch)
+            self.batches += 1
+            self.last_flush_ms = elapsed
+            self._cond.notify_all()
+        return True
+
+    def _drop(self, row: Dict[str, Any], error: Exception) -> None:
+        logger.error("dropping identity check %s that the database rejected: %s row=%r", row["id"], str(error).strip(), row)
+        with self._cond:
+            self._rows.pop(row["id"], None)
+            self._dropped[row["id"]] = None
+            while len(self._dropped) > _DROPPED_REMEMBERED:
+                self._dropped.popitem(last=False)
+            self.rows_dropped += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pending": len(self._rows),
+                "batch": self.batch,
+                "flush_ms": self.flush_interval * 1000.0,
+                "max_pending": self.max_pending,
+                "sync": IDENTITY_WRITE_SYNC,
+                "sync_timeout_s": IDENTITY_WRITE_SYNC_TIMEOUT,
+                "rows_written": self.rows_written,
+                "batches": self.batches,
+                "errors": self.errors,
+                "rows_dropped": self.rows_dropped,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+            }
+
+
+identity_writer = IdentityCheckWriter(IDENTITY_WRITE_BATCH, IDENTITY_WRITE_FLUSH_MS, IDENTITY_WRITE_MAX_PENDING)